@@ -0,0 +1,187 @@
+"""
+比对性能基准：不同规模的合成数据上跑 compare_results，记录各阶段耗时、峰值内存，
+并与参考实现核对结果，写出 JSON 报告。
+
+    python -m benchmarks.compare_bench                              # 1k / 10k / 100k / 1M
+    python -m benchmarks.compare_bench --sizes 1k,10k --engines vectorized,indexed
+    python -m benchmarks.compare_bench --baseline old.json          # 与上次的报告对比，变慢则退出码 1
+
+  * 阶段耗时：借 compare 的进度回调（progress(percent, phase)），两次回报之间的时间记到前一个阶段；
+    另加“显示列”（std_columns / sys_columns，界面上结果出来前必须走的一步）
+  * 峰值内存：单独再跑一遍并用 tracemalloc 统计（numpy 数组的分配也会计入）；
+    多进程并行时只统计主进程
+  * 核对：不超过 --reference-max 行时与逐行的 legacy 引擎比状态码（legacy 的原因码只区分到“不一致”，
+    不比）；更大的规模与 indexed 引擎比状态码 + 原因码 + 孤立标记。legacy 本身也只在这个规模内跑
+"""
+import argparse
+import json
+import platform
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from checker_ui.core import comparator
+
+from .synthetic import synthetic_frames
+
+DEFAULT_SIZES = (1_000, 10_000, 100_000, 1_000_000)
+REFERENCE_MAX = 10_000       # legacy 引擎逐行比对，超过这个规模太慢
+PHASE_DISPLAY = "显示列"
+
+
+def _parse_size(text: str) -> int:
+    text = text.strip().lower()
+    scale = {'k': 1_000, 'm': 1_000_000}.get(text[-1:], 1)
+    return int(float(text.rstrip('km')) * scale)
+
+
+def _timed_compare(std_df, sys_df, engine: str, workers: int):
+    """跑一次比对 → (CompareResult, {阶段: 秒}, 总秒数)"""
+    marks = []
+
+    def progress(_percent, phase):
+        if not marks or marks[-1][1] != phase:
+            marks.append((time.perf_counter(), phase))
+
+    start = time.perf_counter()
+    result = comparator.compare_results(std_df, sys_df, engine=engine, workers=workers, progress=progress)
+    marks.append((time.perf_counter(), PHASE_DISPLAY))
+    result.std_columns()
+    result.sys_columns()
+    end = time.perf_counter()
+
+    phases = {}
+    for (t0, phase), (t1, _) in zip(marks, marks[1:] + [(end, None)]):
+        phases[phase] = phases.get(phase, 0.0) + t1 - t0
+    return result, {k: round(v, 4) for k, v in phases.items()}, round(end - start, 4)
+
+
+def _peak_memory_mb(std_df, sys_df, engine: str, workers: int) -> float:
+    tracemalloc.start()
+    try:
+        result = comparator.compare_results(std_df, sys_df, engine=engine, workers=workers)
+        result.std_columns()
+        result.sys_columns()
+        return round(tracemalloc.get_traced_memory()[1] / 2 ** 20, 1)
+    finally:
+        tracemalloc.stop()
+
+
+def _check(result, reference, strict: bool) -> int:
+    """与参考结果不一致的行数"""
+    pairs = [(result.std_status, reference.std_status), (result.sys_status, reference.sys_status)]
+    if strict:
+        pairs += [(result.std_reason, reference.std_reason), (result.sys_reason, reference.sys_reason),
+                  (result.std_orphan, reference.std_orphan), (result.sys_orphan, reference.sys_orphan)]
+    return int(sum(np.count_nonzero(np.asarray(a) != np.asarray(b)) for a, b in pairs))
+
+
+def run(sizes=DEFAULT_SIZES, engines=(comparator.DEFAULT_ENGINE,), workers: int = 1, repeat: int = 1,
+        memory: bool = True, reference_max: int = REFERENCE_MAX, seed: int = 0, log=print) -> dict:
+    results = []
+    for size in sizes:
+        t = time.perf_counter()
+        std_df, sys_df = synthetic_frames(size, seed=seed)
+        log(f"[{size:>9,}] 生成数据 标准 {len(std_df):,} 行 / 系统 {len(sys_df):,} 行"
+            f"（{time.perf_counter() - t:.2f}s）")
+
+        ref_engine = "legacy" if size <= reference_max else "indexed"
+        reference = None
+        for engine in engines:
+            if engine == "legacy" and size > reference_max:
+                log(f"[{size:>9,}] legacy     跳过（超过 --reference-max）")
+                continue
+            runs = [_timed_compare(std_df, sys_df, engine, workers) for _ in range(repeat)]
+            result, phases, total = min(runs, key=lambda r: r[2])
+            entry = {
+                "size": size, "std_rows": len(std_df), "sys_rows": len(sys_df),
+                "engine": engine, "workers": workers, "repeat": repeat,
+                "seconds": total, "phases": phases,
+            }
+            if memory:
+                entry["peak_mb"] = _peak_memory_mb(std_df, sys_df, engine, workers)
+            if engine == ref_engine:
+                entry["reference"] = {"engine": ref_engine, "mismatches": 0, "ok": True}
+            else:
+                if reference is None:
+                    reference = comparator.compare_results(std_df, sys_df, engine=ref_engine)
+                mismatches = _check(result, reference, strict="legacy" not in (engine, ref_engine))
+                entry["reference"] = {"engine": ref_engine, "mismatches": mismatches, "ok": mismatches == 0}
+            results.append(entry)
+            phase_text = "  ".join(f"{k} {v:.3f}" for k, v in phases.items())
+            mem_text = f"  峰值 {entry['peak_mb']} MB" if memory else ""
+            log(f"[{size:>9,}] {engine:<10} {total:8.3f}s  {phase_text}{mem_text}"
+                f"  核对({ref_engine}) {'OK' if entry['reference']['ok'] else '不一致 %d' % entry['reference']['mismatches']}")
+
+    return {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "comparator_version": comparator.COMPARATOR_VERSION,
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "pandas": pd.__version__,
+            "platform": platform.platform(),
+            "seed": seed,
+        },
+        "results": results,
+    }
+
+
+def compare_reports(report: dict, baseline: dict, tolerance: float, log=print) -> list:
+    """同规模同引擎的总耗时与基线比较；返回变慢超过 tolerance 的条目"""
+    base = {(r["size"], r["engine"], r["workers"]): r for r in baseline.get("results", [])}
+    slower = []
+    for r in report["results"]:
+        old = base.get((r["size"], r["engine"], r["workers"]))
+        if old is None or not old["seconds"]:
+            continue
+        ratio = r["seconds"] / old["seconds"]
+        flag = ""
+        if ratio > 1 + tolerance:
+            slower.append(r)
+            flag = "  ← 变慢"
+        log(f"[{r['size']:>9,}] {r['engine']:<10} {old['seconds']:8.3f}s → {r['seconds']:8.3f}s  ×{ratio:.2f}{flag}")
+    return slower
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="比对性能基准")
+    parser.add_argument("--sizes", default=",".join(map(str, DEFAULT_SIZES)),
+                        help="系统表行数，逗号分隔，可写 1k / 1M（默认 1k,10k,100k,1M）")
+    parser.add_argument("--engines", default=comparator.DEFAULT_ENGINE,
+                        help=f"逗号分隔，可选 {', '.join(comparator.ENGINES)}")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--repeat", type=int, default=1, help="每项重复次数，取最快一次")
+    parser.add_argument("--no-memory", action="store_true", help="不统计峰值内存（省一遍比对）")
+    parser.add_argument("--reference-max", type=int, default=REFERENCE_MAX,
+                        help="不超过该行数时与 legacy 引擎核对，更大的规模与 indexed 核对")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", default="compare_bench.json", help="JSON 报告路径")
+    parser.add_argument("--baseline", help="上次的 JSON 报告；总耗时变慢超过 --tolerance 时退出码为 1")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args(argv)
+
+    engines = [e.strip() for e in args.engines.split(",") if e.strip()]
+    unknown = [e for e in engines if e not in comparator.ENGINES]
+    if unknown:
+        parser.error(f"未知的比对引擎：{', '.join(unknown)}")
+    report = run([_parse_size(s) for s in args.sizes.split(",") if s.strip()], engines,
+                 workers=args.workers, repeat=max(args.repeat, 1), memory=not args.no_memory,
+                 reference_max=args.reference_max, seed=args.seed)
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"报告已写入 {args.out}")
+
+    failed = [r for r in report["results"] if not r["reference"]["ok"]]
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            failed += compare_reports(report, json.load(f), args.tolerance)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
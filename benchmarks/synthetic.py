@@ -0,0 +1,113 @@
+"""
+比对基准用的合成数据：生成与 load_std_df / load_sys_df 返回结构一致的两张表。
+
+  * 系统表：BC POS / BC POS NAME / 组立番号 / 是否上传 / 品番 / __KEY__（已去重）
+  * 标准表：模板第 17 行的 12 列 + __KEY__（只含 最终判定 = Y 的行）
+key 基数、每个 key 的品番 / 组立组合数、'/' 多值、ALL 行、不上传行、key 的大小写 / 空格差异
+都按实际导出文件的比例生成；整个过程是向量化的，百万行几秒内生成完。
+"""
+import numpy as np
+import pandas as pd
+
+STD_COLUMNS = ['ID', '最终判定', 'MSGNO', 'Parts Name', 'Len', 'pos', 'Consistency Check',
+               'Duplication Check', 'Parts ID Format', '上传点位', '品番', '组立番号']
+
+_PART_NAMES = ('HV ECU', 'EPS ECU', 'AB ECU', 'EFI ECU', 'G/W ECU', 'BSM Main', 'BSM SUB',
+               'TSS-CAMERA', 'TSSP-MWV', 'Start&Stop ECU Serial', 'AuxBattery Voltage & SOC')
+
+
+def _s(values) -> pd.Series:
+    return pd.Series(np.asarray(values).astype(str), dtype=object)
+
+
+def _join(*parts) -> pd.Series:
+    out = parts[0]
+    for p in parts[1:]:
+        out = out + p
+    return out
+
+
+def synthetic_frames(n_sys: int, std_ratio: float = 0.1, rows_per_key: int = 20, seed: int = 0):
+    """
+    → (std_df, sys_df)；系统表约 n_sys 行（去重后略少），标准表约 n_sys × std_ratio 行。
+    rows_per_key：平均每个 key 的系统行数（决定 key 基数）
+    """
+    rng = np.random.default_rng(seed)
+    n_keys = max(n_sys // rows_per_key, 1)
+    n_std = max(int(n_sys * std_ratio), 10)
+
+    # key 名与每个 key 的 (品番前 5 位, 组立番号) 组合
+    key_names = _join(_s(np.array(_PART_NAMES, dtype=object)[np.arange(n_keys) % len(_PART_NAMES)]),
+                      ' ', pd.Series(np.arange(n_keys), dtype=object).map('{:05d}'.format))
+    n_combo = rng.integers(1, 5, n_keys)
+    combo_start = np.r_[0, np.cumsum(n_combo)[:-1]]
+    total = int(n_combo.sum())
+    pn5 = _s(rng.integers(10000, 99999, total))
+    lettered = rng.random(total) < 0.1
+    pn5[lettered] = pn5[lettered].str[:4] + 'C'
+    assy_k = _s(rng.integers(100000, 999999, total))
+    assy_l = _s(rng.integers(1, 20, total)).str.zfill(2)
+
+    # ---- 系统表 ----
+    sys_key = rng.permutation(np.arange(n_sys) % n_keys)
+    combo = combo_start[sys_key] + (rng.random(n_sys) * n_combo[sys_key]).astype(np.int64)
+    upload = np.where(rng.random(n_sys) < 0.8, '1', '0')
+    masked = (upload == '0') & (rng.random(n_sys) < 0.5)     # 不上传行常见的占位品番 / 99 段
+    sys_pn = _join(pn5[combo].reset_index(drop=True), '-',
+                   _join('0E', _s(rng.integers(0, 1000, n_sys)).str.zfill(3)))
+    sys_pn[masked] = '*****-*****-**'
+    assy_tail = assy_l[combo].reset_index(drop=True)
+    assy_tail[masked] = '99'
+    sys_name = key_names[sys_key].reset_index(drop=True)
+    variant = rng.random(n_sys)
+    sys_name[variant < 0.03] = sys_name[variant < 0.03].str.upper()
+    sys_name[(variant >= 0.03) & (variant < 0.05)] = ' ' + sys_name[(variant >= 0.03) & (variant < 0.05)] + ' '
+    sys_df = pd.DataFrame({
+        'BC POS': _join('U', _s(sys_key % 100).str.zfill(2)),
+        'BC POS NAME': sys_name,
+        '组立番号': _join(assy_k[combo].reset_index(drop=True), ' ', assy_tail),
+        '是否上传': _s(upload),
+        '品番': sys_pn,
+    })
+    sys_df['__KEY__'] = sys_df['BC POS NAME'].astype(str)
+    sys_df = sys_df.drop_duplicates().reset_index(drop=True)
+
+    # ---- 标准表 ----
+    std_key = rng.integers(0, n_keys, n_std)
+    missing = rng.random(n_std) < 0.03                          # 系统端没有的 key
+    first = combo_start[std_key] + (rng.random(n_std) * n_combo[std_key]).astype(np.int64)
+    second = combo_start[std_key] + (rng.random(n_std) * n_combo[std_key]).astype(np.int64)
+    k1, k2 = assy_k[first].reset_index(drop=True), assy_k[second].reset_index(drop=True)
+    assy1 = _join(k1.str[:4], ' ', k1.str[4:], ' ', assy_l[first].reset_index(drop=True))
+    assy2 = _join(k2.str[:4], ' ', k2.str[4:], ' ', assy_l[second].reset_index(drop=True))
+    pn = pn5[first].reset_index(drop=True)
+
+    r = rng.random(n_std)
+    pn = pn.where(~((r >= 0.80) & (r < 0.95)), pn + '/' + pn5[second].reset_index(drop=True))
+    pn = pn.where(~((r >= 0.95) & (r < 0.98)), _s(rng.integers(10000, 99999, n_std)))   # 品番不一致
+    r = rng.random(n_std)
+    assy = assy1.where(~((r >= 0.75) & (r < 0.95)), assy1 + '/' + assy2)
+    assy = assy.where(~(r >= 0.95), _join(_s(rng.integers(1000, 9999, n_std)), ' 01 01'))  # 组立不一致
+    is_all = rng.random(n_std) < 0.05
+    pn[is_all] = 'ALL'
+    assy[is_all] = 'ALL'
+    pn[rng.random(n_std) < 0.03] = np.nan
+
+    name = key_names[std_key].reset_index(drop=True)
+    name[missing] = _join('MISSING ', pd.Series(np.flatnonzero(missing), dtype=object).astype(str)).to_numpy()
+    std_df = pd.DataFrame({
+        'ID': _s(np.arange(n_std) % 100).str.zfill(2),
+        '最终判定': 'Y',
+        'MSGNO': _join('N', _s(np.arange(n_std) % 1000).str.zfill(3)),
+        'Parts Name': name,
+        'Len': '20',
+        'pos': '01',
+        'Consistency Check': '有',
+        'Duplication Check': '无',
+        'Parts ID Format': '20个C',
+        '上传点位': 'N5-品管',
+        '品番': pn,
+        '组立番号': assy,
+    }, columns=STD_COLUMNS)
+    std_df['__KEY__'] = std_df['Parts Name'].astype(str)
+    return std_df, sys_df
@@ -0,0 +1,115 @@
+"""
+批量比对：同一份系统导出对多份标准文件（每个车型一份，如 303D 及其兄弟车型）。
+
+系统端的归一化、整数编码和 key 分组索引只做一次（PreparedSystem），
+之后每份标准只需预处理自己的几百～几万行再匹配，不再重复付出系统端的开销。
+"""
+import os
+from dataclasses import dataclass
+
+import pandas as pd
+
+from . import exporter, loaders
+from .comparator import (
+    DEFAULT_ENGINE, _MATCHERS, _check_columns, _match, _prepare_std, _prepare_sys,
+    _std_columns, _sys_columns, _write_text,
+)
+from .matchkeys import EncodedSys, encode_sys
+from .progress import PHASE_FINALIZE, PHASE_MATCH, as_tracker
+from .rules import DEFAULT_PROFILE, MatchProfile, compile_profile
+
+SUMMARY_COLUMNS = ['标准文件', '标准行数', '标准 OK', '标准 NG', '系统 OK', '系统 NG', '系统 未配对', '系统 未比对']
+
+
+@dataclass
+class PreparedSystem:
+    """预处理好的系统端：带 __KEY__/__pn5/__assy8 的表 + 上传=0 掩码 + 编码与分组索引"""
+    frame: pd.DataFrame
+    upload0_mask: pd.Series
+    key_col: str
+    pn_col: str
+    as_col: str
+    upload_col: str
+    encoded: EncodedSys
+    profile: MatchProfile = DEFAULT_PROFILE   # 系统端按哪套规则预处理；标准端沿用同一套
+
+
+def prepare_system(sys_df: pd.DataFrame, sys_key_col='BC POS NAME', sys_pn='品番',
+                   sys_as='组立番号', upload_col='是否上传', profile: MatchProfile = None) -> PreparedSystem:
+    """系统端只做一次：列名识别、归一化、编码、建 key 分组索引"""
+    profile = profile or DEFAULT_PROFILE
+    key_col, pn_col, as_col, up_col = _sys_columns(sys_df, sys_key_col, sys_pn, sys_as, upload_col, profile)
+    _check_columns((key_col, pn_col, as_col, up_col))
+    frame, upload0_mask = _prepare_sys(sys_df, key_col, pn_col, as_col, up_col, plan=compile_profile(profile))
+    return PreparedSystem(frame, upload0_mask, key_col, pn_col, as_col, up_col,
+                          encode_sys(frame, upload0_mask), profile)
+
+
+def compare_prepared(std_df: pd.DataFrame, prepared: PreparedSystem,
+                     std_key_col='BC POS NAME', std_pn='品番', std_as='组立番号',
+                     engine: str = DEFAULT_ENGINE):
+    """单份标准 × 预处理好的系统端；返回值与 compare 相同"""
+    if engine not in _MATCHERS:
+        raise ValueError(f"未知的比对引擎：{engine}")
+    profile = prepared.profile
+    key_col, pn_col, as_col = _check_columns(_std_columns(std_df, std_key_col, std_pn, std_as, profile))
+
+    std_out, is_all = _prepare_std(std_df, key_col, pn_col, as_col, plan=compile_profile(profile))
+    sys_out = prepared.frame.copy()  # 每份标准的系统端结果不同，只复制结果所在的表
+    codes = _match(engine, std_out, sys_out, is_all, prepared.upload0_mask, prepared.encoded)
+    _write_text(std_out, sys_out, codes)
+    return std_out, sys_out
+
+
+def summarize(std_out: pd.DataFrame, sys_out: pd.DataFrame) -> dict:
+    std_res, sys_res = std_out['比对结果'], sys_out['比对结果']
+    return {
+        '标准行数': len(std_out),
+        '标准 OK': int((std_res == 'OK').sum()),
+        '标准 NG': int((std_res == 'NG').sum()),
+        '系统 OK': int((sys_res == 'OK').sum()),
+        '系统 NG': int((sys_res == 'NG').sum()),
+        '系统 未配对': int((sys_res == '未配对').sum()),
+        '系统 未比对': int((sys_res == '未比对').sum()),
+    }
+
+
+def compare_batch(std_frames: dict, sys_df, engine: str = DEFAULT_ENGINE, profile: MatchProfile = None,
+                  **std_cols):
+    """
+    std_frames: {名称: 标准表}；sys_df 可直接传 PreparedSystem（此时沿用其规则配置）。
+    返回 ({名称: (std_out, sys_out)}, 汇总表)
+    """
+    prepared = sys_df if isinstance(sys_df, PreparedSystem) else prepare_system(sys_df, profile=profile)
+    results, rows = {}, []
+    for name, std_df in std_frames.items():
+        std_out, sys_out = compare_prepared(std_df, prepared, engine=engine, **std_cols)
+        results[name] = (std_out, sys_out)
+        rows.append({'标准文件': name, **summarize(std_out, sys_out)})
+    return results, pd.DataFrame(rows, columns=SUMMARY_COLUMNS)
+
+
+def run_batch_files(std_paths, sys_df: pd.DataFrame, out_dir: str, engine: str = DEFAULT_ENGINE,
+                    profile: MatchProfile = None, progress=None, cancel=None):
+    """
+    读取多份标准文件，与同一系统表比对；每份结果导出为 <文件名>_对比结果.xlsx，
+    另写一份 批量汇总.xlsx。返回汇总表。进度按已完成的文件数回报。
+    """
+    tracker = as_tracker(progress, cancel)
+    tracker.report(0, PHASE_MATCH)
+    prepared = prepare_system(sys_df, profile=profile)
+    rows = []
+    step = 85 / max(len(std_paths), 1)
+    for i, path in enumerate(std_paths):
+        lo = 10 + step * i
+        name = os.path.splitext(os.path.basename(path))[0]
+        std_df = loaders.load_std_df(path, progress=tracker.sub(lo, lo + step / 2))
+        tracker.report(lo + step / 2, PHASE_MATCH)
+        std_out, sys_out = compare_prepared(std_df, prepared, engine=engine)
+        exporter.export(std_out, sys_out, os.path.join(out_dir, f"{name}_对比结果.xlsx"))
+        rows.append({'标准文件': name, **summarize(std_out, sys_out)})
+
+    tracker.report(95, PHASE_FINALIZE)
+    summary = pd.DataFrame(rows, columns=SUMMARY_COLUMNS)
+    summary.to_excel(os.path.join(out_dir, "批量汇总.xlsx"), index=False)
+    return summary
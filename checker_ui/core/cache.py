@@ -0,0 +1,268 @@
+"""
+磁盘缓存：
+  * 比对结果：同一对文件被多人反复打开比对时，直接取上次的结果。
+    缓存键 = 标准文件内容哈希 + 系统文件内容哈希 + 比对器版本 + 读取规则版本 + 比对选项；
+    内容哈希取读表时的（结果是按当时读出的表算的，比对前文件又被覆盖也不会存错键）；
+  * 已解析的表：load_std_df / load_sys_df 清洗好的 DataFrame，同一个文件再次打开时不再解析 xlsx。
+    缓存键 = 文件内容哈希 + 读取函数 + LOADER_VERSION；
+    内容哈希按 (路径, 大小, 修改时间) 记下来，文件没动过就不再重算，再次打开只剩读缓存的时间。
+内容哈希按原始字节计算，文件改名 / 拷贝不影响命中，内容有任何变化都不会误命中。
+比对结果以压缩 pickle 存盘；表存 Feather（列式，读回很快，pyarrow 见 requirements.txt），
+读回后列类型 / 列名会变的表（object 列、非字符串列名）以及没装 pyarrow 时用压缩 pickle。
+总大小超过上限时按最近使用时间（LRU）淘汰（读表缓存记下的内容哈希文件也算在内）。
+"""
+import hashlib
+import json
+import os
+import pickle
+import sys
+import tempfile
+import zlib
+
+from .comparator import COMPARATOR_VERSION
+from .loaders import LOADER_VERSION
+
+RESULT_CACHE_MAX_BYTES = 512 * 1024 * 1024
+FRAME_CACHE_MAX_BYTES = 1024 * 1024 * 1024
+_ARROW_MAGIC = b"ARROW1"
+_ATTRS_KEY = b"checker_ui.attrs"
+_DIGEST_SUFFIX = ".digest"
+
+
+def default_cache_dir(name: str) -> str:
+    """mac: ~/Library/Caches/checker_ui ; Windows: %LOCALAPPDATA%\\checker_ui\\cache ; 其它：临时目录"""
+    if sys.platform.startswith("darwin"):
+        base = os.path.expanduser("~/Library/Caches/checker_ui")
+    elif os.name == "nt":
+        base = os.path.join(os.environ.get("LOCALAPPDATA", os.path.expanduser("~")), "checker_ui", "cache")
+    else:
+        base = os.path.join(tempfile.gettempdir(), "checker_ui_cache")
+    return os.path.join(base, name)
+
+
+def file_digest(path: str, block: int = 1 << 20) -> str:
+    """按原始字节计算内容哈希"""
+    h = hashlib.blake2b(digest_size=20)
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(block), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class DiskCache:
+    """目录下每个键一个文件；命中时刷新文件时间，写入后按时间淘汰到上限以内"""
+    suffix = ".pkl.z"
+    extra_suffixes = ()     # 同样计入大小上限、参与淘汰 / 清空的其它文件
+
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key + self.suffix)
+
+    def _dumps(self, value) -> bytes:
+        return zlib.compress(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL), 1)
+
+    def _loads(self, data: bytes):
+        return pickle.loads(zlib.decompress(data))
+
+    def _entries(self):
+        out = []
+        for name in os.listdir(self.directory):
+            if not name.endswith((self.suffix,) + self.extra_suffixes):
+                continue
+            p = os.path.join(self.directory, name)
+            try:
+                st = os.stat(p)
+            except OSError:
+                continue
+            out.append((st.st_mtime, st.st_size, p))
+        return out
+
+    def get(self, key: str):
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                value = self._loads(f.read())
+        except Exception:
+            # 文件损坏、或是别的 pandas / 程序版本写的 pickle（AttributeError / ModuleNotFoundError 等）：按未命中处理
+            return None
+        try:
+            os.utime(path)  # LRU：最近使用
+        except OSError:
+            pass
+        return value
+
+    def put(self, key: str, value):
+        data = self._dumps(value)
+        if len(data) > self.max_bytes:
+            return
+        path = self._path(key)
+        tmp = path + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)  # 原子替换，避免并发读到半个文件
+        self.evict()
+
+    def evict(self):
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        for _, size, p in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(p)
+                total -= size
+            except OSError:
+                pass
+
+    def size(self) -> int:
+        return sum(size for _, size, _ in self._entries())
+
+    def clear(self) -> int:
+        """清空缓存，返回释放的字节数"""
+        freed = 0
+        for _, size, p in self._entries():
+            try:
+                os.remove(p)
+                freed += size
+            except OSError:
+                pass
+        return freed
+
+
+class ResultCache(DiskCache):
+    """(std_df, sys_df) 比对结果缓存"""
+
+    def __init__(self, directory: str = None, max_bytes: int = RESULT_CACHE_MAX_BYTES):
+        super().__init__(directory or default_cache_dir("results"), max_bytes)
+
+    @staticmethod
+    def key_for(std_digest: str, sys_digest: str, **options) -> str:
+        """std_digest / sys_digest: 两个文件读表时的内容哈希（见 FrameCache.digest）"""
+        h = hashlib.blake2b(digest_size=20)
+        # 结果按读取出的行对齐：读取规则（LOADER_VERSION）变了，旧结果也不能再用
+        for part in (std_digest, sys_digest, COMPARATOR_VERSION, LOADER_VERSION,
+                     repr(sorted(options.items()))):
+            h.update(part.encode("utf-8"))
+            h.update(b"\0")
+        return h.hexdigest()
+
+
+def cached_compare(cache: ResultCache, std_digest: str, sys_digest: str, compute, **options):
+    """
+    命中直接返回缓存的 (std_df, sys_df)；未命中调用 compute() 并写入缓存。
+    std_digest / sys_digest 为 compute 所用的表读取时的文件内容哈希；
+    options 为影响结果的比对选项（列名映射等），会并入缓存键。
+    """
+    key = cache.key_for(std_digest, sys_digest, **options)
+    hit = cache.get(key)
+    if hit is not None:
+        return hit
+    result = compute()
+    cache.put(key, result)
+    return result
+
+
+class FrameCache(DiskCache):
+    """load_std_df / load_sys_df 结果缓存（已清洗的 DataFrame）"""
+    suffix = ".frame"
+    extra_suffixes = (_DIGEST_SUFFIX,)
+
+    def __init__(self, directory: str = None, max_bytes: int = FRAME_CACHE_MAX_BYTES):
+        super().__init__(directory or default_cache_dir("frames"), max_bytes)
+
+    def digest(self, path: str) -> str:
+        """
+        文件内容哈希；(绝对路径, 大小, 修改时间) 没变时直接用上次记下的哈希，
+        变了（或第一次见）才读全文件重算。记下的哈希文件和缓存的表一起按 LRU 淘汰
+        """
+        st = os.stat(path)
+        stamp = f"{os.path.abspath(path)}|{st.st_size}|{st.st_mtime_ns}"
+        memo = os.path.join(self.directory,
+                            hashlib.blake2b(stamp.encode("utf-8"), digest_size=16).hexdigest() + _DIGEST_SUFFIX)
+        try:
+            with open(memo, encoding="ascii") as f:
+                digest = f.read().strip()
+            os.utime(memo)  # LRU：最近使用
+            return digest
+        except OSError:
+            pass
+        digest = file_digest(path)
+        try:
+            with open(memo + ".tmp", "w", encoding="ascii") as f:
+                f.write(digest)
+            os.replace(memo + ".tmp", memo)
+            self.evict()
+        except OSError:
+            pass
+        return digest
+
+    def key_for(self, path: str, loader: str, **options) -> str:
+        h = hashlib.blake2b(digest_size=20)
+        for part in (self.digest(path), loader, LOADER_VERSION, repr(sorted(options.items()))):
+            h.update(part.encode("utf-8"))
+            h.update(b"\0")
+        return h.hexdigest()
+
+    def _dumps(self, df) -> bytes:
+        """
+        写 Feather（attrs 存进 schema 元数据）。读回会走样的表用 pickle：
+        object 列（如整数夹空值的列读回变成浮点，12345 → '12345.0'）、非字符串列名（读回变成字符串）
+        """
+        if any(dtype == object for dtype in df.dtypes) or not all(isinstance(c, str) for c in df.columns):
+            return super()._dumps(df)
+        try:
+            import pyarrow as pa
+            import pyarrow.feather as feather
+        except ImportError:
+            return super()._dumps(df)
+        try:
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            meta = dict(table.schema.metadata or {})
+            meta[_ATTRS_KEY] = json.dumps(df.attrs, ensure_ascii=False).encode("utf-8")
+            sink = pa.BufferOutputStream()
+            feather.write_feather(table.replace_schema_metadata(meta), sink)
+            return sink.getvalue().to_pybytes()
+        except (pa.ArrowException, TypeError, ValueError):
+            return super()._dumps(df)
+
+    def _loads(self, data: bytes):
+        if not data.startswith(_ARROW_MAGIC):
+            return super()._loads(data)
+        try:
+            import pyarrow as pa
+            import pyarrow.feather as feather
+        except ImportError:
+            raise ValueError("缓存为 Feather 格式，但未安装 pyarrow")
+        table = feather.read_table(pa.BufferReader(data))
+        df = table.to_pandas()
+        df.attrs = json.loads((table.schema.metadata or {}).get(_ATTRS_KEY, b"{}"))
+        return df
+
+
+def _call(load, path, progress=None, cancel=None, **options):
+    return load(path, progress=progress, cancel=cancel, **options)
+
+
+def cached_load(cache: FrameCache, load, path: str, progress=None, cancel=None, run=_call, **options):
+    """
+    命中直接返回缓存的表；未命中调用 load(path, progress, cancel, **options) 并写入缓存。
+    options（如 dtypes）是缓存键的一部分。缓存目录不可写等问题只影响缓存本身，不影响读取。
+    run: 未命中时怎样调用 load，如 loaders.load_in_process（在子进程里读）；签名 run(load, path, progress, cancel, **options)
+    """
+    try:
+        key = cache.key_for(path, load.__name__, **options)
+    except OSError:
+        return run(load, path, progress=progress, cancel=cancel, **options)
+    hit = cache.get(key)
+    if hit is not None:
+        return hit
+    df = run(load, path, progress=progress, cancel=cancel, **options)
+    try:
+        cache.put(key, df)
+    except OSError:
+        pass
+    return df
@@ -1,101 +1,167 @@
+import numpy as np
 import pandas as pd
-import re, unicodedata
+import unicodedata
+from dataclasses import dataclass
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from functools import lru_cache
 
-def _normalize_key(s: str) -> str:
-    """BC POS NAME / Parts Name 等作 key 时：大小写、全角半角统一"""
-    return unicodedata.normalize("NFKC", str(s)).strip().lower()
+from .keysuggest import suggest_keys
+from .rules import DEFAULT_PROFILE, MatchPlan, MatchProfile, compile_profile
+from .matchkeys import encode_sides
+from .progress import (
+    NULL_TRACKER, PHASE_FINALIZE, PHASE_INDEX, PHASE_MATCH, PHASE_NORMALIZE, as_tracker,
+)
 
+# 比对引擎：legacy = 原逐行实现（保留用于上线期间对照输出）；indexed = key 索引单次遍历；
+# vectorized = 展开候选表后 merge + groupby 集合运算（无逐行写入）
+ENGINES = ("legacy", "indexed", "vectorized")
+DEFAULT_ENGINE = "vectorized"
 
-def _pn_key_alnum(p):
-    """品番：保留字母数字，转大写，取前 5 位；用于兼容 8646C 这类写法"""
-    s = re.sub(r'[^0-9A-Za-z]', '', str(p)).upper()
-    return s[:5]
+# 判定规则 / 输出列变化时递增（结果缓存据此失效）
+COMPARATOR_VERSION = "9"
 
-def _pn_keys_multi(p):
-    """标准文件的品番可能用'/'分隔多个，只要任一匹配即 OK"""
-    if pd.isna(p):
-        return []
-    keys = []
-    for seg in str(p).split('/'):
-        seg = seg.strip()
-        if not seg:
-            continue
-        keys.append(_pn_key_alnum(seg))
-    return keys or [""]
+# 结果列（copy-free 模式下不写回原表，显示 / 导出时再按行号拼接）
+RESULT_COLUMNS = ('比对结果', 'NG原因')
 
-def _assy8(a):
-    """任意字符串抽取 8 位组立番号（不足补 0）"""
-    s = re.sub(r'\D', '', str(a))
-    if len(s) >= 8:
-        return s[:8]
-    return s.zfill(8)
+# 状态码 / 原因码（int8）；文字只在显示 / 导出时按下表映射
+STATUS_UNPAIRED, STATUS_OK, STATUS_NG, STATUS_SKIPPED = 0, 1, 2, 3
+STATUS_TEXT = ('未配对', 'OK', 'NG', '未比对')
 
-def _find_col(df, names):
-    for n in names:
-        if n in df.columns:
-            return n
-    return None
+REASON_NONE = 0
+REASON_BY_ALL = 1         # 系统行由 标准品番=ALL 判 OK
+REASON_NO_UPLOAD = 2      # ALL 标准行：组内无上传=1 的系统行
+REASON_PN = 3             # 品番不一致
+REASON_ASSY = 4           # 品番一致、组立不一致
+REASON_NO_SYS = 5         # 非 ALL 标准行：组内无上传=1 的系统行
+REASON_NOT_UPLOADED = 6   # 上传=0
+REASON_MISMATCH = 7       # 品番或组立不一致（legacy 引擎不区分）
+REASON_NO_SYS_KEY = 8     # 孤立标准行：系统端完全没有这个 key
+REASON_NO_STD_KEY = 9     # 孤立系统行：标准端完全没有这个 key
+REASON_TEXT = ('', '标准品番=ALL', '无上传=1 的系统行', '品番不一致', '组立不一致',
+               '无对应系统行', '不上传', '品番或组立不一致', '系统无此 key', '标准无此 key')
+# compare() 整表输出沿用原来的文字（品番 / 组立 / 无系统行 三种不一致合并显示，孤立系统行原因留空）
+LEGACY_REASON_TEXT = (REASON_TEXT[:3] + ('品番或组立不一致',) * 3 + REASON_TEXT[6:8]
+                      + ('品番或组立不一致', ''))
 
-def _split_std_assy_list(v: str) -> list[str]:
-    """标准侧：'xxx/yyy/zzz' → [八位, 八位, ...]"""
-    if pd.isna(v):
-        return []
-    outs = []
-    for seg in str(v).split('/'):
-        seg = seg.strip()
-        if not seg:
-            continue
-        outs.append(_assy8(seg))
-    return outs
+# 不一致说明：NG 标准行在同 key 组里最接近的系统行，以及与它不同的字段
+EXPLAIN_COLUMNS = ('最近系统行', '差异字段')
+DIFF_NONE, DIFF_PN, DIFF_ASSY, DIFF_BOTH = 0, 1, 2, 3
+DIFF_TEXT = ('', '品番', '组立', '品番+组立')
 
-def compare(std_df: pd.DataFrame, sys_df: pd.DataFrame,
-            std_key_col='BC POS NAME', sys_key_col='BC POS NAME',
-            std_pn='品番',        sys_pn='品番',
-            std_as='组立番号',    sys_as='组立番号',
-            upload_col='是否上传'):
+
+@dataclass
+class MatchLinks:
     """
-    修正版：
-      1) key 做 NFKC+lower 统一，避免大小写/全角半角导致的错判
-      2) 品番比较统一成 “只取数字前 5 位”
-      3) 系统端/标准端组立番号都统一 8 位（标准端支持‘/’多值）
-      4) 标准品番 = ALL ⇒ 组里只要有 上传=1 就判 OK
-      5) 上传=0 ⇒ 一律“未比对”（灰色）
+    标准行 ↔ 命中的系统行（稀疏索引，两个方向各一份 CSR）：
+      sys_of_std[std_offsets[i]:std_offsets[i+1]] = 标准第 i 行命中的系统行号
+      std_of_sys[sys_offsets[j]:sys_offsets[j+1]] = 命中系统第 j 行的标准行号
+    界面联动选择时每次点击只是一次切片。
     """
-    std_df = std_df.copy()
-    sys_df = sys_df.copy()
+    std_offsets: np.ndarray
+    sys_of_std: np.ndarray
+    sys_offsets: np.ndarray
+    std_of_sys: np.ndarray
 
-    # 列名自动识别
-    std_key_col = _find_col(std_df, [std_key_col, 'BC POS Name', 'BC POS', '零件名称', 'Parts Name', '__KEY__'])
-    sys_key_col = _find_col(sys_df, [sys_key_col, 'BC POS Name', 'BC POS', '零件名称', 'Parts Name', '__KEY__'])
-    upload_col  = _find_col(sys_df, [upload_col, '上传', '是否上传'])
-    std_pn      = _find_col(std_df, [std_pn, '标准品番', 'PN', '品番（标准）'])
-    sys_pn      = _find_col(sys_df, [sys_pn, '系统品番', 'PN', '品番（系统）'])
-    std_as      = _find_col(std_df, [std_as, '标准组立番号'])
-    sys_as      = _find_col(sys_df, [sys_as, '系统组立番号', 'GP.CP./HIKI. ITEM', '组立番号'])
-
-    if not all([std_key_col, sys_key_col, upload_col, std_pn, sys_pn, std_as, sys_as]):
-        raise ValueError("缺少必要列，无法比对（请检查“品番/组立番号/是否上传/BC POS NAME”等列名）")
+    @classmethod
+    def from_pairs(cls, std_pos, sys_pos, n_std: int, n_sys: int) -> "MatchLinks":
+        """(标准行号, 系统行号) 命中对 → 去重后建两个方向的 CSR"""
+        packed = np.sort(np.asarray(std_pos, dtype=np.int64) * max(n_sys, 1) + np.asarray(sys_pos, dtype=np.int64))
+        packed = packed[np.r_[True, packed[1:] != packed[:-1]]] if len(packed) else packed   # 去重
+        std_pos, sys_pos = np.divmod(packed, max(n_sys, 1))   # 已按 (标准, 系统) 排序
+        order = np.argsort(sys_pos, kind='stable')             # 同一系统行内仍按标准行排序
+        std_offsets = np.zeros(n_std + 1, dtype=np.int64)
+        sys_offsets = np.zeros(n_sys + 1, dtype=np.int64)
+        np.cumsum(np.bincount(std_pos, minlength=n_std), out=std_offsets[1:])
+        np.cumsum(np.bincount(sys_pos, minlength=n_sys), out=sys_offsets[1:])
+        return cls(std_offsets, sys_pos, sys_offsets, std_pos[order])
 
-    # 统一 key
-    std_df['__KEY__'] = std_df[std_key_col].astype(str).map(_normalize_key)
-    sys_df['__KEY__'] = sys_df[sys_key_col].astype(str).map(_normalize_key)
+    def sys_rows(self, std_row: int) -> np.ndarray:
+        return self.sys_of_std[self.std_offsets[std_row]:self.std_offsets[std_row + 1]]
 
-    # 结果列初始化
-    std_df[['比对结果', 'NG原因']] = ['', '']
-    sys_df[['比对结果', 'NG原因']] = ['未配对', '']
+    def std_rows(self, sys_row: int) -> np.ndarray:
+        return self.std_of_sys[self.sys_offsets[sys_row]:self.sys_offsets[sys_row + 1]]
+
+    def pairs(self):
+        """→ (标准行号, 系统行号) 数组，按标准行排序"""
+        return np.repeat(np.arange(len(self.std_offsets) - 1), np.diff(self.std_offsets)), self.sys_of_std
+
+
+@dataclass
+class CompareResult:
+    """copy-free 比对结果：每行一个状态码 + 原因码（int8），与输入表按行号对齐"""
+    std_status: np.ndarray
+    std_reason: np.ndarray
+    sys_status: np.ndarray
+    sys_reason: np.ndarray
+    std_orphan: np.ndarray = None   # 该行 key 在系统端完全不存在
+    sys_orphan: np.ndarray = None   # 该行 key 在标准端完全不存在（与是否上传无关）
+    orphan_std_keys: int = 0        # 孤立标准 key 个数（去重）
+    key_suggestions: pd.DataFrame = None   # 孤立标准 key 的近似系统 key（见 keysuggest）
+    std_near: np.ndarray = None     # 品番 / 组立不一致的标准行 → 同 key 最接近的系统行号（-1 = 无）
+    std_diff: np.ndarray = None     # 与该系统行不同的字段（DIFF_*）；legacy 引擎不计算
+    links: MatchLinks = None        # 标准行 ↔ 命中系统行的稀疏索引；legacy 引擎不计算
 
-    # 上传标记
-    upload0_mask = sys_df[upload_col].astype(str).str.strip() == '0'
+    def std_columns(self) -> dict:
+        """{结果列名: 文字} ，供显示 / 导出；码表映射是惰性的"""
+        columns = dict(zip(RESULT_COLUMNS, (status_labels(self.std_status), reason_labels(self.std_reason))))
+        if self.std_near is not None:
+            # 显示为系统表的第几行（1 起）
+            near = pd.array(self.std_near + 1, dtype='Int64')
+            near[self.std_near < 0] = pd.NA
+            columns.update(zip(EXPLAIN_COLUMNS, (near, diff_labels(self.std_diff))))
+        return columns
+
+    def sys_columns(self) -> dict:
+        return dict(zip(RESULT_COLUMNS, (status_labels(self.sys_status), reason_labels(self.sys_reason))))
+
+# 归一化缓存上限（跨多次比对共享；同一工厂的 key / 品番 / 组立取值有限）
+NORMALIZE_CACHE_SIZE = 65536
+
+# 长循环里每隔多少步检查一次取消（兼顾响应速度与开销）
+_CHECK_EVERY = 4096
+
+
+@lru_cache(maxsize=NORMALIZE_CACHE_SIZE)
+def _normalize_key(s: str) -> str:
+    """BC POS NAME / Parts Name 等作 key 时：大小写、全角半角统一"""
+    return unicodedata.normalize("NFKC", str(s)).strip().lower()
+
+
+def _find_col(df, names):
+    for n in names:
+        if n in df.columns:
+            return n
+    return None
+
+def _map_unique(values: pd.Series, fn, tracker=NULL_TRACKER) -> pd.Series:
+    """
+    factorize 优先的逐列归一化：只对唯一值调用 fn，再按 code 回填。
+    同一 BC POS NAME / 品番 会在成千上万行里重复出现，逐格 .map 会重复做 NFKC / 正则。
+      * object 列先转文本再分组（factorize 会把 1 / 1.0 / True 视为同值，而 str() 结果不同）
+      * 空值逐格处理，保证与 .map(fn) 完全一致
+    """
+    na = values.isna().to_numpy()
+    keys = values.astype(str) if values.dtype == object else values
+    codes, uniques = pd.factorize(keys)
 
-    # 预计算系统端品番/组立
-    sys_df['__pn5'] = sys_df[sys_pn].map(_pn_key_alnum)
-    sys_df['__assy8'] = sys_df[sys_as].map(_assy8)
+    mapped = np.empty(len(uniques) + 1, dtype=object)  # 末位占位：code=-1（空值）
+    for i, u in enumerate(np.asarray(uniques, dtype=object)):
+        if i % _CHECK_EVERY == 0:
+            tracker.check()
+        mapped[i] = fn(u)
+    out = mapped[codes]
+    for pos in np.flatnonzero(na):
+        out[pos] = fn(values.iat[pos])
+    return pd.Series(out, index=values.index)
 
-    # 预计算标准端品番/组立
-    std_df['__pn5_list'] = std_df[std_pn].map(_pn_keys_multi)
-    std_df['__assy_list'] = std_df[std_as].map(_split_std_assy_list)
 
-    for idx, row in std_df.iterrows():
+def _match_legacy(std_df, sys_df, is_all, upload0_mask, sys_enc=None, tracker=NULL_TRACKER):
+    """原实现：逐个标准行在整张系统表里按 key 过滤（O(n·m)）"""
+    n_std = max(len(std_df), 1)
+    for i, (idx, row) in enumerate(std_df.iterrows()):
+        if i % 64 == 0:
+            tracker.report(100 * i / n_std, PHASE_MATCH)
+        tracker.check()
         key = row['__KEY__']
         pn_keys = row['__pn5_list']
         candidates = row['__assy_list']
@@ -104,7 +170,7 @@ def compare(std_df: pd.DataFrame, sys_df: pd.DataFrame,
         grp1 = grp_all[~upload0_mask.loc[grp_all.index]]  # 只看上传=1
 
         # 标准品番=ALL
-        if str(row[std_pn]).strip().upper() == 'ALL':
+        if is_all[i]:
             if len(grp1) > 0:
                 std_df.loc[idx, ['比对结果', 'NG原因']] = ['OK', '']
                 sys_df.loc[grp1.index, ['比对结果', 'NG原因']] = ['OK', '标准品番=ALL']
@@ -130,6 +196,593 @@ def compare(std_df: pd.DataFrame, sys_df: pd.DataFrame,
             if len(remaining) > 0:
                 sys_df.loc[remaining.index, ['比对结果', 'NG原因']] = ['NG', '品番或组立不一致']
 
-    # 上传=0 固定灰色“未比对”
-    sys_df.loc[upload0_mask, ['比对结果', 'NG原因']] = ['未比对', '不上传']
-    return std_df, sys_df
\ No newline at end of file
+    return CompareResult(*_text_to_codes(std_df), *_text_to_codes(sys_df))
+
+
+def _text_to_codes(df):
+    """legacy 引擎写出的文字结果列 → (状态码, 原因码)"""
+    status = pd.Index(STATUS_TEXT).get_indexer(df['比对结果'])
+    reason = pd.Index(REASON_TEXT).get_indexer(df['NG原因'])
+    return status.astype(np.int8), reason.astype(np.int8)
+
+
+def _pack_base(*arrays) -> np.int64:
+    """(key, 值) 打包成 key * base + 值 时用的 base：取值上界 + 1，任何规则配置下都不会撞码"""
+    return np.int64(max((int(a.max()) for a in arrays if len(a)), default=0) + 1)
+
+
+def _pn_hits(enc):
+    """
+    只看品番（忽略组立）的命中，用于区分 NG 原因：
+      标准行：同 key 的上传=1 系统行里有没有它的品番
+      系统行：同 key 的非 ALL 标准行里有没有它的品番
+    (key, pn5) 打包成一个 int64 后用 np.isin 判断。
+    """
+    base = _pack_base(enc.pn_values, enc.sys.pn5)
+    pn_row = np.repeat(np.arange(len(enc.std_key)), np.diff(enc.pn_offsets))
+    keep = ~enc.std_is_all[pn_row]
+    std_pairs = enc.std_key[pn_row[keep]] * base + enc.pn_values[keep]
+    sys_pairs = enc.sys.key * base + enc.sys.pn5
+
+    std_hit = np.zeros(len(enc.std_key), dtype=bool)
+    std_hit[pn_row[keep][np.isin(std_pairs, sys_pairs)]] = True
+    return std_hit, np.isin(sys_pairs, std_pairs)
+
+
+def _first_hits(sys_pairs, std_key, offsets, values, rows, base) -> np.ndarray:
+    """
+    rows 指定的标准行：同 key 的上传=1 系统行里，值落在该行候选列表中的第一行（上传=1 子集下标，-1 = 无）。
+    (key, 值) 打包成 int64；系统端按打包值去重时保留首次出现的下标，标准端 searchsorted 查找。
+    """
+    uniq, first = np.unique(sys_pairs, return_index=True)
+    row = np.repeat(np.arange(len(std_key)), np.diff(offsets))
+    keep = rows[row]
+    row, pairs = row[keep], std_key[row[keep]] * base + values[keep]
+    loc = np.minimum(np.searchsorted(uniq, pairs), max(len(uniq) - 1, 0))
+    found = uniq[loc] == pairs if len(uniq) else np.zeros(len(pairs), dtype=bool)
+
+    out = np.full(len(std_key), len(sys_pairs), dtype=np.int64)
+    np.minimum.at(out, row[found], first[loc[found]])
+    out[out == len(sys_pairs)] = -1
+    return out
+
+
+def _explain(enc, std_reason):
+    """
+    品番 / 组立不一致的标准行 → 同 key 组里最接近的系统行号 + 差异字段，直接用匹配阶段的 key 编号与分组索引：
+      组立不一致：组内第一条品番命中的系统行（差异 = 组立）
+      品番不一致：组内第一条组立命中的系统行（差异 = 品番）；
+                  组立为空（通配）⇒ 组内第一行（差异 = 品番）；都不命中 ⇒ 组内第一行（差异 = 品番+组立）
+    """
+    n_std = len(enc.std_key)
+    near = np.full(n_std, -1, dtype=np.int64)
+    diff = np.zeros(n_std, dtype=np.int8)
+    is_pn, is_assy = std_reason == REASON_PN, std_reason == REASON_ASSY
+    if not (is_pn.any() or is_assy.any()):
+        return near, diff
+
+    pn_base, assy_base = _pack_base(enc.pn_values, enc.sys.pn5), _pack_base(enc.assy_values, enc.sys.assy8)
+    by_pn = _first_hits(enc.sys.key * pn_base + enc.sys.pn5, enc.std_key,
+                        enc.pn_offsets, enc.pn_values, is_assy, pn_base)
+    by_assy = _first_hits(enc.sys.key * assy_base + enc.sys.assy8, enc.std_key,
+                          enc.assy_offsets, enc.assy_values, is_pn, assy_base)
+    # 品番不一致的行必然有系统行（否则原因是“无对应系统行”），key 编号 < 系统端 key 数
+    group_first = np.full(n_std, -1, dtype=np.int64)
+    group_first[is_pn] = enc.sys.order[enc.sys.starts[enc.std_key[is_pn]]]
+
+    wild = is_pn & (np.diff(enc.assy_offsets) == 0)
+    near[is_assy], diff[is_assy] = by_pn[is_assy], DIFF_ASSY
+    assy_hit = is_pn & (by_assy >= 0)
+    near[assy_hit], diff[assy_hit] = by_assy[assy_hit], DIFF_PN
+    rest = is_pn & ~assy_hit
+    near[rest] = group_first[rest]
+    diff[rest] = np.where(wild[rest], DIFF_PN, DIFF_BOTH)
+
+    found = near >= 0
+    near[found] = enc.sys.pos[near[found]]  # 上传=1 子集下标 → 系统表行号
+    return near, diff
+
+
+def _result_codes(enc, n_sys, std_ok, is_all, sys_ok, sys_by_all, pairs) -> 'CompareResult':
+    """
+    把匹配阶段得到的布尔数组一次性换算成状态码 / 原因码，并给品番 / 组立不一致的标准行附上说明；
+    pairs = (标准行号, 上传=1 子集下标) 命中对，建成 MatchLinks
+    """
+    std_pn_hit, sys_pn_hit = _pn_hits(enc)
+    std_has_sys = enc.std_key < len(enc.sys.keys)  # 系统端 key 编号只来自上传=1 的行
+    ok, by_all, checked = _scatter_sys(enc, n_sys, sys_ok, sys_by_all)
+    pn_hit = np.zeros(n_sys, dtype=bool)
+    pn_hit[enc.sys.pos] = sys_pn_hit
+    std_reason = np.select([std_ok, is_all, ~std_has_sys, std_pn_hit],
+                           [REASON_NONE, REASON_NO_UPLOAD, REASON_NO_SYS, REASON_ASSY], REASON_PN).astype(np.int8)
+    std_near, std_diff = _explain(enc, std_reason)
+
+    return CompareResult(
+        std_status=np.where(std_ok, STATUS_OK, STATUS_NG).astype(np.int8),
+        std_reason=std_reason,
+        sys_status=np.select([ok, checked], [STATUS_OK, STATUS_NG], STATUS_UNPAIRED).astype(np.int8),
+        sys_reason=np.select([ok & by_all, ok, checked & pn_hit, checked],
+                             [REASON_BY_ALL, REASON_NONE, REASON_ASSY, REASON_PN], REASON_NONE).astype(np.int8),
+        std_near=std_near,
+        std_diff=std_diff,
+        links=MatchLinks.from_pairs(pairs[0], enc.sys.pos[pairs[1]], len(enc.std_key), n_sys),
+    )
+
+
+def _scatter_sys(enc, n_sys, sys_ok, sys_by_all):
+    """上传=1 子集上的结果 → 系统表全长数组；同 key 有非 ALL 标准行的上传=1 行记为“已比对”"""
+    nonall_keys = np.zeros(enc.n_keys, dtype=bool)
+    nonall_keys[enc.std_key[~enc.std_is_all]] = True
+    ok = np.zeros(n_sys, dtype=bool)
+    by_all = np.zeros(n_sys, dtype=bool)
+    checked = np.zeros(n_sys, dtype=bool)
+    ok[enc.sys.pos] = sys_ok
+    by_all[enc.sys.pos] = sys_by_all
+    checked[enc.sys.pos] = nonall_keys[enc.sys.key]
+    return ok, by_all, checked
+
+
+def _match_indexed(std_df, sys_df, is_all, upload0_mask, sys_enc=None, tracker=NULL_TRACKER):
+    """
+    key 索引版：系统端（上传=1）按 key 编号排序一次，每个 key 对应一段连续行号；
+    标准端单次遍历，组内用 np.isin 判断品番 / 组立是否命中。
+    系统行的最终状态只取决于同 key 的标准行（按标准行顺序）：
+      - 最后一次把它判 OK 的若是 ALL 行 ⇒ 原因“标准品番=ALL”
+      - 从未被判 OK、但同 key 有非 ALL 标准行 ⇒ NG
+      - 同 key 没有标准行 ⇒ 保持“未配对”
+    与 legacy 逐行写入的结果完全一致。
+    """
+    tracker.report(0, PHASE_INDEX)
+    enc = encode_sides(std_df, sys_df, is_all, upload0_mask, sys_enc)
+    tracker.report(30, PHASE_MATCH)
+
+    # 系统端分组索引（按 key 编号排序后的连续区间）；标准端独有的 key 组为空
+    order = enc.sys.order
+    starts = np.zeros(enc.n_keys, dtype=np.int64)
+    ends = np.zeros(enc.n_keys, dtype=np.int64)
+    n_sys_keys = len(enc.sys.keys)
+    starts[:n_sys_keys] = enc.sys.starts
+    ends[:n_sys_keys] = enc.sys.starts + enc.sys.counts
+
+    m1 = len(enc.sys.pos)
+    sys_ok = np.zeros(m1, dtype=bool)
+    sys_by_all = np.zeros(m1, dtype=bool)
+    std_ok = np.zeros(len(std_df), dtype=bool)
+    po, ao = enc.pn_offsets, enc.assy_offsets
+    link_rows, link_hits = [], []   # 命中对：标准行号 + 命中的上传=1 子集下标
+
+    n_std = max(len(std_df), 1)
+    for i, k in enumerate(enc.std_key):
+        if i % _CHECK_EVERY == 0:
+            tracker.report(30 + 70 * i / n_std, PHASE_MATCH)
+        grp1 = order[starts[k]:ends[k]]
+
+        if is_all[i]:
+            if len(grp1) > 0:
+                std_ok[i] = True
+                sys_ok[grp1] = True
+                sys_by_all[grp1] = True
+                link_rows.append(i)
+                link_hits.append(grp1)
+            continue
+
+        if len(grp1) == 0:
+            continue
+        hit = np.isin(enc.sys.pn5[grp1], enc.pn_values[po[i]:po[i + 1]])
+        candidates = enc.assy_values[ao[i]:ao[i + 1]]
+        if len(candidates):
+            hit &= np.isin(enc.sys.assy8[grp1], candidates)
+        hits = grp1[hit]
+        if len(hits):
+            std_ok[i] = True
+            sys_ok[hits] = True
+            sys_by_all[hits] = False
+            link_rows.append(i)
+            link_hits.append(hits)
+
+    pairs = (np.repeat(np.asarray(link_rows, dtype=np.int64), [len(h) for h in link_hits]),
+             np.concatenate(link_hits) if link_hits else np.empty(0, dtype=np.int64))
+    return _result_codes(enc, len(sys_df), std_ok, is_all, sys_ok, sys_by_all, pairs)
+
+
+def _match_vectorized(std_df, sys_df, is_all, upload0_mask, sys_enc=None, tracker=NULL_TRACKER):
+    """
+    集合运算版：
+      1) 标准端非 ALL 行按 品番 × 组立 展开成长表（候选表，整数编码，np.repeat 展开）
+      2) 与系统端（上传=1）按 (key, pn5, assy8) merge 得到命中对；
+         组立列表为空的标准行视为通配，只按 (key, pn5) merge
+      3) ALL 行只按 key merge
+      4) 命中对 groupby 聚合出每行 OK/NG；系统行取“最后一个”命中的标准行决定原因
+    结果与 legacy / indexed 一致。
+    """
+    tracker.report(0, PHASE_INDEX)
+    enc = encode_sides(std_df, sys_df, is_all, upload0_mask, sys_enc)
+    n_std = len(std_df)
+    tracker.report(30, PHASE_MATCH)
+
+    sys_side = pd.DataFrame({
+        'sys_idx': np.arange(len(enc.sys.pos)),
+        'key': enc.sys.key,
+        'pn5': enc.sys.pn5,
+        'assy8': enc.sys.assy8,
+    })
+
+    # ALL 行：同 key 的上传=1 行全部命中
+    all_rows = np.flatnonzero(is_all)
+    all_pairs = pd.DataFrame({'std_pos': all_rows, 'key': enc.std_key[all_rows]}) \
+        .merge(sys_side[['sys_idx', 'key']], on='key')[['std_pos', 'sys_idx']]
+
+    # 非 ALL 行：每个品番元素一行
+    pn_len = np.diff(enc.pn_offsets)
+    assy_len = np.diff(enc.assy_offsets)
+    pn_row = np.repeat(np.arange(n_std), pn_len)
+    keep = ~is_all[pn_row]
+    pn_row, pn_val = pn_row[keep], enc.pn_values[keep]
+
+    # 组立列表为空 ⇒ 通配
+    wild = assy_len[pn_row] == 0
+    cand_wild = pd.DataFrame({
+        'std_pos': pn_row[wild],
+        'key': enc.std_key[pn_row[wild]],
+        'pn5': pn_val[wild],
+    }).drop_duplicates()
+
+    # 其余：每个品番元素 × 该行全部组立
+    rows, vals = pn_row[~wild], pn_val[~wild]
+    rep = assy_len[rows]
+    std_pos = np.repeat(rows, rep)
+    within = np.arange(rep.sum()) - np.repeat(np.cumsum(rep) - rep, rep)
+    cand = pd.DataFrame({
+        'std_pos': std_pos,
+        'key': enc.std_key[std_pos],
+        'pn5': np.repeat(vals, rep),
+        'assy8': enc.assy_values[enc.assy_offsets[std_pos] + within],
+    })
+
+    tracker.report(45, PHASE_MATCH)
+    pairs_exact = cand.merge(sys_side, on=['key', 'pn5', 'assy8'])[['std_pos', 'sys_idx']]
+    tracker.report(70, PHASE_MATCH)
+    pairs_wild = cand_wild.merge(sys_side, on=['key', 'pn5'])[['std_pos', 'sys_idx']]
+    events = pd.concat([pairs_exact, pairs_wild, all_pairs], ignore_index=True)
+    tracker.report(85, PHASE_MATCH)
+
+    # 标准端：有任一命中即 OK
+    std_ok = np.zeros(n_std, dtype=bool)
+    std_ok[events['std_pos'].to_numpy()] = True
+
+    # 系统端：最后一个命中的标准行若为 ALL ⇒ “标准品番=ALL”
+    last = events.groupby('sys_idx')['std_pos'].max()
+    sys_ok = np.zeros(len(enc.sys.pos), dtype=bool)
+    sys_by_all = np.zeros(len(enc.sys.pos), dtype=bool)
+    sys_ok[last.index.to_numpy()] = True
+    sys_by_all[last.index.to_numpy()] = is_all[last.to_numpy()]
+
+    pairs = (events['std_pos'].to_numpy(), events['sys_idx'].to_numpy())
+    return _result_codes(enc, len(sys_df), std_ok, is_all, sys_ok, sys_by_all, pairs)
+
+
+_MATCHERS = {
+    "legacy": _match_legacy,
+    "indexed": _match_indexed,
+    "vectorized": _match_vectorized,
+}
+
+
+def _std_columns(std_df, key_col, pn_col, as_col, profile: MatchProfile = DEFAULT_PROFILE):
+    """显式列名优先，其次按规则配置里的候选列名"""
+    return (
+        _find_col(std_df, [key_col, *profile.std_key_columns]),
+        _find_col(std_df, [pn_col, *profile.std_pn_columns]),
+        _find_col(std_df, [as_col, *profile.std_as_columns]),
+    )
+
+
+def _sys_columns(sys_df, key_col, pn_col, as_col, upload_col, profile: MatchProfile = DEFAULT_PROFILE):
+    return (
+        _find_col(sys_df, [key_col, *profile.sys_key_columns]),
+        _find_col(sys_df, [pn_col, *profile.sys_pn_columns]),
+        _find_col(sys_df, [as_col, *profile.sys_as_columns]),
+        _find_col(sys_df, [upload_col, *profile.upload_columns]),
+    )
+
+
+def _check_columns(cols):
+    if not all(cols):
+        raise ValueError("缺少必要列，无法比对（请检查“品番/组立番号/是否上传/BC POS NAME”等列名）")
+    return cols
+
+
+def _resolve_columns(std_df, sys_df, std_key_col, sys_key_col, std_pn, sys_pn, std_as, sys_as, upload_col,
+                     profile: MatchProfile = DEFAULT_PROFILE):
+    """列名自动识别；缺列直接报错"""
+    s_key, s_pn, s_as = _std_columns(std_df, std_key_col, std_pn, std_as, profile)
+    y_key, y_pn, y_as, y_up = _sys_columns(sys_df, sys_key_col, sys_pn, sys_as, upload_col, profile)
+    return _check_columns((s_key, y_key, s_pn, y_pn, s_as, y_as, y_up))
+
+
+def _partition_ids(keys: pd.Series, n_parts: int) -> np.ndarray:
+    """按归一化 key 的稳定哈希分区（不依赖进程内随机化的 hash()）"""
+    return (pd.util.hash_array(keys.to_numpy(dtype=object)) % np.uint64(n_parts)).astype(np.int64)
+
+
+def _concat_in_order(frames, positions):
+    """各分区结果拼回原始行顺序"""
+    non_empty = [(f, p) for f, p in zip(frames, positions) if len(f)]
+    if not non_empty:
+        return frames[0]
+    out = pd.concat([f for f, _ in non_empty])
+    order = np.argsort(np.concatenate([p for _, p in non_empty]), kind='stable')
+    return out.iloc[order]
+
+
+def _combine_frames(results, std_positions, sys_positions):
+    return (_concat_in_order([r[0] for r in results], std_positions),
+            _concat_in_order([r[1] for r in results], sys_positions))
+
+
+def _combine_codes(results, std_positions, sys_positions):
+    def side(arrays, positions):
+        order = np.argsort(np.concatenate(positions), kind='stable')
+        return np.concatenate(arrays)[order]
+
+    def near(r, sys_pos):
+        # 分区内的系统行号 → 整表行号
+        out = r.std_near.copy()
+        out[out >= 0] = sys_pos[out[out >= 0]]
+        return out
+
+    def links():
+        std_rows, sys_rows = [], []
+        for r, std_pos, sys_pos in zip(results, std_positions, sys_positions):
+            s, y = r.links.pairs()
+            std_rows.append(std_pos[s])
+            sys_rows.append(sys_pos[y])
+        return MatchLinks.from_pairs(np.concatenate(std_rows), np.concatenate(sys_rows),
+                                     sum(map(len, std_positions)), sum(map(len, sys_positions)))
+
+    explained = all(r.std_near is not None for r in results)
+    linked = all(r.links is not None for r in results)
+    # 分区按 key 切分，孤立 key 个数可以直接相加
+    return CompareResult(
+        side([r.std_status for r in results], std_positions),
+        side([r.std_reason for r in results], std_positions),
+        side([r.sys_status for r in results], sys_positions),
+        side([r.sys_reason for r in results], sys_positions),
+        side([r.std_orphan for r in results], std_positions),
+        side([r.sys_orphan for r in results], sys_positions),
+        sum(r.orphan_std_keys for r in results),
+        std_near=side([near(r, p) for r, p in zip(results, sys_positions)], std_positions) if explained else None,
+        std_diff=side([r.std_diff for r in results], std_positions) if explained else None,
+        links=links() if linked else None,
+    )
+
+
+def _compare_parallel(fn, combine, std_df, sys_df, workers, tracker=NULL_TRACKER, **kwargs):
+    """
+    分区并行：同一 __KEY__ 的判定只依赖本组行，因此按 key 哈希把两侧切成 workers 份，
+    每份在子进程里走串行 fn（compare / compare_results），最后用 combine 按原始行号拼回，
+    结果与串行完全一致。
+    进度按已完成的分区数回报；取消时丢弃排队中的分区，不等正在运行的子进程结束。
+    """
+    tracker.report(0, PHASE_NORMALIZE)
+    std_key_col, sys_key_col = _resolve_columns(
+        std_df, sys_df, kwargs['std_key_col'], kwargs['sys_key_col'], kwargs['std_pn'], kwargs['sys_pn'],
+        kwargs['std_as'], kwargs['sys_as'], kwargs['upload_col'], kwargs['profile'])[:2]
+    std_part = _partition_ids(_map_unique(std_df[std_key_col], _normalize_key, tracker), workers)
+    sys_part = _partition_ids(_map_unique(sys_df[sys_key_col], _normalize_key, tracker), workers)
+
+    std_pos = [np.flatnonzero(std_part == p) for p in range(workers)]
+    sys_pos = [np.flatnonzero(sys_part == p) for p in range(workers)]
+    jobs = [p for p in range(workers) if len(std_pos[p]) or len(sys_pos[p])]
+    if len(jobs) <= 1:
+        return fn(std_df, sys_df, workers=1, progress=tracker.sub(10, 100), **kwargs)
+
+    tracker.report(10, PHASE_MATCH)
+    pool = ProcessPoolExecutor(max_workers=min(workers, len(jobs)))
+    try:
+        futures = [pool.submit(fn, std_df.iloc[std_pos[p]], sys_df.iloc[sys_pos[p]], workers=1, **kwargs)
+                   for p in jobs]
+        pending = set(futures)
+        while pending:
+            tracker.report(10 + 80 * (len(futures) - len(pending)) / len(futures), PHASE_MATCH)
+            _, pending = wait(pending, timeout=0.1, return_when=FIRST_COMPLETED)
+        results = [f.result() for f in futures]
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    tracker.report(90, PHASE_FINALIZE)
+    out = combine(results, [std_pos[p] for p in jobs], [sys_pos[p] for p in jobs])
+    tracker.report(100, PHASE_FINALIZE)
+    return out
+
+
+def _prepare_std(std_df, key_col, pn_col, as_col, tracker=NULL_TRACKER, plan: MatchPlan = None):
+    """标准端：复制后加 __KEY__ / 结果列 / 品番、组立候选列表；返回 (表, 品番=ALL 掩码)"""
+    plan = plan or compile_profile()
+    std_df = std_df.copy()
+    std_df['__KEY__'] = _map_unique(std_df[key_col], _normalize_key, tracker)
+    std_df[['比对结果', 'NG原因']] = ['', '']
+    std_df['__pn5_list'] = _map_unique(std_df[pn_col], plan.pn_list, tracker)
+    std_df['__assy_list'] = _map_unique(std_df[as_col], plan.assy_list, tracker)
+    return std_df, plan.wildcard_mask(std_df[pn_col])
+
+
+def _prepare_sys(sys_df, key_col, pn_col, as_col, upload_col, tracker=NULL_TRACKER, plan: MatchPlan = None):
+    """系统端：复制后加 __KEY__ / 结果列 / 品番、组立；返回 (表, 上传=0 掩码)"""
+    plan = plan or compile_profile()
+    sys_df = sys_df.copy()
+    sys_df['__KEY__'] = _map_unique(sys_df[key_col], _normalize_key, tracker)
+    sys_df[['比对结果', 'NG原因']] = ['未配对', '']
+    upload0_mask = plan.skip_mask(sys_df[upload_col])
+    sys_df['__pn5'] = _map_unique(sys_df[pn_col], plan.pn, tracker)
+    sys_df['__assy8'] = _map_unique(sys_df[as_col], plan.assy, tracker)
+    return sys_df, upload0_mask
+
+
+def _orphans(std_keys, sys_keys):
+    """
+    anti-join：两侧归一化 key 一起 factorize 一次，按 key 编号判断另一侧是否存在。
+    返回 (标准行孤立掩码, 系统行孤立掩码, 孤立标准 key 个数)
+    """
+    std_keys = np.asarray(std_keys, dtype=object)
+    codes, uniques = pd.factorize(np.concatenate([std_keys, np.asarray(sys_keys, dtype=object)]))
+    std_codes, sys_codes = codes[:len(std_keys)], codes[len(std_keys):]
+    in_std = np.zeros(len(uniques), dtype=bool)
+    in_sys = np.zeros(len(uniques), dtype=bool)
+    in_std[std_codes] = True
+    in_sys[sys_codes] = True
+    return ~in_sys[std_codes], ~in_std[sys_codes], int((in_std & ~in_sys).sum())
+
+
+def mark_orphans(codes: CompareResult, std_keys, sys_keys, orphans=None) -> CompareResult:
+    """
+    标出孤立行并单独归类（原地修改）：
+      系统行：key 不在标准端 ⇒ sys_orphan；上传=1 的（原“未配对”）原因记为“标准无此 key”
+      标准行：key 不在系统端 ⇒ std_orphan；非 ALL 的 NG 行原因记为“系统无此 key”
+    orphans: 调用方已算好的 (标准行孤立掩码, 系统行孤立掩码, 孤立标准 key 个数)，同 _orphans 的返回
+    """
+    std_orphan, sys_orphan, n_keys = orphans if orphans is not None else _orphans(std_keys, sys_keys)
+    codes.std_orphan, codes.sys_orphan, codes.orphan_std_keys = std_orphan, sys_orphan, n_keys
+    codes.sys_reason[sys_orphan & (codes.sys_status == STATUS_UNPAIRED)] = REASON_NO_STD_KEY
+    codes.std_reason[std_orphan & (codes.std_status == STATUS_NG) & (codes.std_reason != REASON_NO_UPLOAD)] = \
+        REASON_NO_SYS_KEY
+    return codes
+
+
+def attach_suggestions(codes: CompareResult, std_keys, sys_keys, tracker=NULL_TRACKER) -> CompareResult:
+    """为孤立标准 key 找近似系统 key（原地写入 key_suggestions）；需先 mark_orphans"""
+    std_keys = np.asarray(std_keys, dtype=object)
+    codes.key_suggestions = suggest_keys(std_keys[codes.std_orphan], sys_keys, tracker=tracker)
+    return codes
+
+
+def _match(engine, std_df, sys_df, is_all, upload0_mask, sys_enc=None, tracker=NULL_TRACKER) -> CompareResult:
+    """跑匹配引擎得到状态码 / 原因码；上传=0 固定“未比对”（灰色）；最后标出孤立行"""
+    codes = _MATCHERS[engine](std_df, sys_df, is_all, upload0_mask, sys_enc, tracker=tracker)
+    mask = upload0_mask.to_numpy()
+    codes.sys_status[mask] = STATUS_SKIPPED
+    codes.sys_reason[mask] = REASON_NOT_UPLOADED
+    return mark_orphans(codes, std_df['__KEY__'], sys_df['__KEY__'])
+
+
+def _write_text(std_df, sys_df, codes: CompareResult):
+    """状态码 / 原因码 → compare() 整表输出的文字结果列（原因沿用原来的文字）"""
+    status_text = np.array(STATUS_TEXT, dtype=object)
+    reason_text = np.array(LEGACY_REASON_TEXT, dtype=object)
+    std_df['比对结果'] = status_text[codes.std_status]
+    std_df['NG原因'] = reason_text[codes.std_reason]
+    sys_df['比对结果'] = status_text[codes.sys_status]
+    sys_df['NG原因'] = reason_text[codes.sys_reason]
+
+
+def _compare_codes(std_df, sys_df, cols, engine, tracker, plan: MatchPlan):
+    """串行比对主体：预处理两侧 → 匹配；返回 (标准工作表, 系统工作表, 结果码)"""
+    std_key_col, sys_key_col, std_pn, sys_pn, std_as, sys_as, upload_col = cols
+    tracker.report(0, PHASE_NORMALIZE)
+    std_df, is_all = _prepare_std(std_df, std_key_col, std_pn, std_as, tracker, plan)
+    tracker.report(10, PHASE_NORMALIZE)
+    sys_df, upload0_mask = _prepare_sys(sys_df, sys_key_col, sys_pn, sys_as, upload_col, tracker, plan)
+    codes = _match(engine, std_df, sys_df, is_all, upload0_mask, tracker=tracker.sub(40, 95))
+    return std_df, sys_df, codes
+
+
+def compare(std_df: pd.DataFrame, sys_df: pd.DataFrame,
+            std_key_col='BC POS NAME', sys_key_col='BC POS NAME',
+            std_pn='品番',        sys_pn='品番',
+            std_as='组立番号',    sys_as='组立番号',
+            upload_col='是否上传', engine: str = DEFAULT_ENGINE, workers: int = 1,
+            profile: MatchProfile = None, progress=None, cancel=None):
+    """
+    修正版：
+      1) key 做 NFKC+lower 统一，避免大小写/全角半角导致的错判
+      2) 品番比较统一成 “只取数字前 5 位”
+      3) 系统端/标准端组立番号都统一 8 位（标准端支持‘/’多值）
+      4) 标准品番 = ALL ⇒ 组里只要有 上传=1 就判 OK
+      5) 上传=0 ⇒ 一律“未比对”（灰色）
+    profile: 匹配规则配置（rules.MatchProfile）；以上 2)–5) 的位数 / 分隔符 / 通配 / 不上传取值
+             和列名候选都可由配置修改，None = 默认规则
+    engine: 'vectorized'（默认，merge + groupby 集合运算）、'indexed'（key 索引单次遍历）
+            或 'legacy'（原逐行实现，用于对照）
+    workers: >1 时按 key 分区，用多进程并行比对（结果与串行一致）
+    progress: 进度回调 progress(percent, phase)；cancel: CancelToken，取消后抛 CompareCancelled
+    """
+    if engine not in _MATCHERS:
+        raise ValueError(f"未知的比对引擎：{engine}（可选：{', '.join(ENGINES)}）")
+    tracker = as_tracker(progress, cancel)
+
+    profile = profile or DEFAULT_PROFILE
+
+    if workers > 1:
+        return _compare_parallel(
+            compare, _combine_frames, std_df, sys_df, workers, tracker,
+            std_key_col=std_key_col, sys_key_col=sys_key_col, std_pn=std_pn, sys_pn=sys_pn,
+            std_as=std_as, sys_as=sys_as, upload_col=upload_col, engine=engine, profile=profile)
+
+    # 列名自动识别
+    cols = _resolve_columns(std_df, sys_df, std_key_col, sys_key_col, std_pn, sys_pn, std_as, sys_as, upload_col,
+                            profile)
+    std_df, sys_df, codes = _compare_codes(std_df, sys_df, cols, engine, tracker, compile_profile(profile))
+    tracker.report(95, PHASE_FINALIZE)
+    _write_text(std_df, sys_df, codes)
+    tracker.report(100, PHASE_FINALIZE)
+    return std_df, sys_df
+
+
+def status_labels(codes: np.ndarray) -> pd.Categorical:
+    """状态码 → 文字（Categorical 只引用码表，不展开成字符串数组）"""
+    return pd.Categorical.from_codes(codes, categories=STATUS_TEXT)
+
+
+def reason_labels(codes: np.ndarray) -> pd.Categorical:
+    return pd.Categorical.from_codes(codes, categories=REASON_TEXT)
+
+
+def diff_labels(codes: np.ndarray) -> pd.Categorical:
+    return pd.Categorical.from_codes(codes, categories=DIFF_TEXT)
+
+
+def join_results(df: pd.DataFrame, columns: dict) -> pd.DataFrame:
+    """原表 + 结果列 → 完整结果表（只在确实需要一张整表时调用）"""
+    return df.assign(**columns)
+
+
+def compare_results(std_df: pd.DataFrame, sys_df: pd.DataFrame,
+                    std_key_col='BC POS NAME', sys_key_col='BC POS NAME',
+                    std_pn='品番',        sys_pn='品番',
+                    std_as='组立番号',    sys_as='组立番号',
+                    upload_col='是否上传', engine: str = DEFAULT_ENGINE, workers: int = 1,
+                    suggest: bool = False, profile: MatchProfile = None,
+                    progress=None, cancel=None) -> CompareResult:
+    """
+    copy-free 模式：判定规则与 compare 相同，但不复制、不修改输入表。
+    只取参与比对的几列组成内部工作表，辅助列（__pn5 / __assy_list 等）匹配完即丢弃，
+    返回与输入表行号对齐的 CompareResult（int8 状态码 / 原因码，品番不一致与组立不一致分开）。
+    suggest: 同时为孤立标准 key 计算近似系统 key（CompareResult.key_suggestions）
+    profile: 同 compare
+    """
+    if engine not in _MATCHERS:
+        raise ValueError(f"未知的比对引擎：{engine}（可选：{', '.join(ENGINES)}）")
+    tracker = as_tracker(progress, cancel)
+    profile = profile or DEFAULT_PROFILE
+
+    cols = _resolve_columns(std_df, sys_df, std_key_col, sys_key_col, std_pn, sys_pn, std_as, sys_as, upload_col,
+                            profile)
+    r_std_key, r_sys_key, r_std_pn, r_sys_pn, r_std_as, r_sys_as, r_upload = cols
+    std_work = std_df[list(dict.fromkeys((r_std_key, r_std_pn, r_std_as)))]
+    sys_work = sys_df[list(dict.fromkeys((r_sys_key, r_sys_pn, r_sys_as, r_upload)))]
+
+    if workers > 1:
+        match_tracker = tracker.sub(0, 90) if suggest else tracker
+        codes = _compare_parallel(
+            compare_results, _combine_codes, std_work, sys_work, workers, match_tracker,
+            std_key_col=r_std_key, sys_key_col=r_sys_key, std_pn=r_std_pn, sys_pn=r_sys_pn,
+            std_as=r_std_as, sys_as=r_sys_as, upload_col=r_upload, engine=engine, profile=profile)
+        if suggest:
+            attach_suggestions(codes, _map_unique(std_work[r_std_key], _normalize_key, tracker),
+                               _map_unique(sys_work[r_sys_key], _normalize_key, tracker), tracker)
+    else:
+        std_prep, sys_prep, codes = _compare_codes(std_work, sys_work, cols, engine, tracker, compile_profile(profile))
+        if suggest:
+            attach_suggestions(codes, std_prep['__KEY__'], sys_prep['__KEY__'], tracker)
+    tracker.report(100, PHASE_FINALIZE)
+    return codes
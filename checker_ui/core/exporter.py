@@ -1,20 +1,46 @@
 import pandas as pd
 from datetime import datetime
 
-def export(std_df: pd.DataFrame, sys_df: pd.DataFrame, path: str):
+
+def _text_widths(values) -> list:
+    """各单元格 str() 后的长度；Categorical / 字符串列只量一遍唯一值（不展开成 object 列）"""
+    values = pd.Series(values)
+    if isinstance(values.dtype, (pd.CategoricalDtype, pd.StringDtype)):
+        return [len(str(x)) for x in pd.unique(values.dropna())]
+    return [len(str(x)) for x in values.astype(str).tolist()]
+
+
+def _write_side(writer, sheet, df, extra, startcol):
+    """原表后面紧接着写结果列（copy-free 结果不先拼成整表）"""
+    df.to_excel(writer, sheet_name=sheet, startrow=0, startcol=startcol, index=False)
+    if extra:
+        pd.DataFrame(extra, index=df.index).to_excel(
+            writer, sheet_name=sheet, startrow=0, startcol=startcol + len(df.columns), index=False)
+
+
+def export(std_df: pd.DataFrame, sys_df: pd.DataFrame, path: str, result=None):
     """
     将标准 & 系统两个结果表导出到一个 Sheet（左右分区）
     - 首行冻结
     - OK/NG/未比对 三色底
     - 自动列宽
     - 末尾统计
+    result: compare_results 的 CompareResult；给出时 std_df / sys_df 为原始读取表，
+            结果列在写出时按行号拼在各自右侧；带近似 key 建议时另写一个“key 建议”Sheet
     """
+    std_extra = result.std_columns() if result is not None else {}
+    sys_extra = result.sys_columns() if result is not None else {}
+
+    def column(df, extra, name):
+        return pd.Series(extra[name], index=df.index) if name in extra else df.get(name)
+
     with pd.ExcelWriter(path, engine='xlsxwriter') as writer:
         book = writer.book
         sheet = '对比结果'
 
-        std_df.to_excel(writer, sheet_name=sheet, startrow=0, startcol=0, index=False)
-        sys_df.to_excel(writer, sheet_name=sheet, startrow=0, startcol=len(std_df.columns) + 2, index=False)
+        ncols_std = len(std_df.columns) + len(std_extra)
+        _write_side(writer, sheet, std_df, std_extra, 0)
+        _write_side(writer, sheet, sys_df, sys_extra, ncols_std + 2)
 
         ws = writer.sheets[sheet]
 
@@ -23,9 +49,6 @@ def export(std_df: pd.DataFrame, sys_df: pd.DataFrame, path: str):
         fmt_ng   = book.add_format({'bg_color': '#FFEBEE'})
         fmt_grey = book.add_format({'bg_color': '#F5F5F5'})
 
-        ncols_std = len(std_df.columns)
-        ncols_sys = len(sys_df.columns)
-
         # 冻结首行
         ws.freeze_panes(1, 0)
 
@@ -33,19 +56,21 @@ def export(std_df: pd.DataFrame, sys_df: pd.DataFrame, path: str):
         ws.set_row(0, None, fmt_header)
 
         # 自动列宽
-        def set_auto_width(df, offset_col):
-            for i, col in enumerate(df.columns):
-                max_len = max([len(str(col))] + [len(str(x)) for x in df[col].astype(str).tolist()] + [8])
+        def set_auto_width(df, extra, offset_col):
+            names = list(df.columns) + list(extra)
+            for i, col in enumerate(names):
+                max_len = max([len(str(col))] + _text_widths(column(df, extra, col)) + [8])
                 ws.set_column(offset_col + i, offset_col + i, max_len + 2)
 
-        set_auto_width(std_df, 0)
-        set_auto_width(sys_df, ncols_std + 2)
+        set_auto_width(std_df, std_extra, 0)
+        set_auto_width(sys_df, sys_extra, ncols_std + 2)
 
         # 行着色
-        def colorize(df, start_col):
-            if '比对结果' not in df.columns:
+        def colorize(df, extra, start_col):
+            status = column(df, extra, '比对结果')
+            if status is None:
                 return
-            for r, res in enumerate(df['比对结果'], start=1):
+            for r, res in enumerate(status, start=1):
                 if res == 'OK':
                     fmt = fmt_ok
                 elif res == 'NG':
@@ -57,16 +82,29 @@ def export(std_df: pd.DataFrame, sys_df: pd.DataFrame, path: str):
                 if fmt:
                     ws.set_row(r, None, fmt)
 
-        colorize(std_df, 0)
-        colorize(sys_df, ncols_std + 2)
+        colorize(std_df, std_extra, 0)
+        colorize(sys_df, sys_extra, ncols_std + 2)
 
         # 统计
-        ok_std = int((std_df.get('比对结果') == 'OK').sum()) if '比对结果' in std_df.columns else 0
-        ng_std = int((std_df.get('比对结果') == 'NG').sum()) if '比对结果' in std_df.columns else 0
-        ok_sys = int((sys_df.get('比对结果') == 'OK').sum()) if '比对结果' in sys_df.columns else 0
-        ng_sys = int((sys_df.get('比对结果') == 'NG').sum()) if '比对结果' in sys_df.columns else 0
+        std_status = column(std_df, std_extra, '比对结果')
+        sys_status = column(sys_df, sys_extra, '比对结果')
+        ok_std = int((std_status == 'OK').sum()) if std_status is not None else 0
+        ng_std = int((std_status == 'NG').sum()) if std_status is not None else 0
+        ok_sys = int((sys_status == 'OK').sum()) if sys_status is not None else 0
+        ng_sys = int((sys_status == 'NG').sum()) if sys_status is not None else 0
 
         last_row = max(len(std_df), len(sys_df)) + 3
         ws.write(last_row,   0, f'导出时间: {datetime.now():%Y-%m-%d %H:%M:%S}')
         ws.write(last_row+1, 0, f'标准 OK: {ok_std} / NG: {ng_std}')
-        ws.write(last_row+2, 0, f'系统 OK: {ok_sys} / NG: {ng_sys}')
\ No newline at end of file
+        ws.write(last_row+2, 0, f'系统 OK: {ok_sys} / NG: {ng_sys}')
+
+        # 近似 key 建议（比对时勾选了才有）
+        suggestions = getattr(result, 'key_suggestions', None)
+        if suggestions is not None and len(suggestions):
+            suggestions.to_excel(writer, sheet_name='key 建议', index=False)
+            ws_sug = writer.sheets['key 建议']
+            ws_sug.freeze_panes(1, 0)
+            ws_sug.set_row(0, None, fmt_header)
+            for i, col in enumerate(suggestions.columns):
+                width = max([len(str(col))] + [len(str(x)) for x in suggestions[col].tolist()] + [8])
+                ws_sug.set_column(i, i, width + 2)
\ No newline at end of file
@@ -0,0 +1,149 @@
+"""
+比对用整数编码（只在匹配阶段内部使用）：
+  * key（归一化后的 BC POS NAME）→ 标准/系统两侧共用的 int64 编号
+  * 组立番号（规则配置的位数，默认 8 位数字）→ 两侧共用的 int64 编号（按字符串 factorize，
+    不用 int()：'１２３４５６７８' 这类全角数字与 '12345678' 逐字比较时不相等，编号也必须不同）
+  * 品番前 N 位字母数字（默认 5 位）→ base-37 打包 int64
+      0 作填充位，'0'-'9' → 1-10，'A'-'Z' → 11-36，长度不同的品番不会撞码
+  * 标准端多值列（每格一个 list）→ 扁平 offsets + values（CSR）
+这样成员判断可以直接用 np.isin / searchsorted，不再逐个比较 Python 字符串。
+"""
+from dataclasses import dataclass
+from functools import lru_cache
+from itertools import chain
+
+import numpy as np
+import pandas as pd
+
+_PN_ALPHABET = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+_PN_DIGIT = {ch: i + 1 for i, ch in enumerate(_PN_ALPHABET)}
+PN5_BASE = 37
+
+
+@lru_cache(maxsize=65536)
+def pn5_code(s: str) -> int:
+    """'8646C' → 打包整数；空串 → 0"""
+    v = 0
+    for ch in s:
+        v = v * PN5_BASE + _PN_DIGIT[ch]
+    return v
+
+
+def encode_values(values, fn) -> np.ndarray:
+    """factorize 优先：只对唯一值编码，再按 code 回填成 int64 数组"""
+    codes, uniques = pd.factorize(np.asarray(values, dtype=object))
+    table = np.fromiter((fn(u) for u in uniques), dtype=np.int64, count=len(uniques))
+    return table[codes]
+
+
+def encode_shared(values, vocab: pd.Index) -> np.ndarray:
+    """
+    按系统端的取值表编号（同 key 的编法）：在 vocab 里的取 vocab 下标，
+    不在的另行 factorize、排在 vocab 之后，保证不同字符串编号不同
+    """
+    values = np.asarray(values, dtype=object)
+    codes = vocab.get_indexer(values).astype(np.int64)
+    missing = codes < 0
+    if missing.any():
+        extra, _ = pd.factorize(values[missing])
+        codes[missing] = extra + len(vocab)
+    return codes
+
+
+def _flatten(lists) -> tuple[np.ndarray, list]:
+    """每格一个 list 的列 → (offsets, 扁平取值)；第 i 行的取值为 flat[offsets[i]:offsets[i+1]]"""
+    lists = np.asarray(lists, dtype=object)
+    lengths = np.fromiter(map(len, lists), dtype=np.int64, count=len(lists))
+    offsets = np.zeros(len(lists) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=offsets[1:])
+    return offsets, list(chain.from_iterable(lists))
+
+
+def encode_lists(lists, fn) -> tuple[np.ndarray, np.ndarray]:
+    """每格一个 list 的列 → (offsets, values)；第 i 行的取值为 values[offsets[i]:offsets[i+1]]"""
+    offsets, flat = _flatten(lists)
+    values = encode_values(flat, fn) if flat else np.empty(0, dtype=np.int64)
+    return offsets, values
+
+
+@dataclass
+class EncodedSys:
+    """系统端（上传=1 的行）编码 + 按 key 分组的索引；可在多份标准之间复用"""
+    pos: np.ndarray         # 在系统表中的行号
+    key: np.ndarray
+    pn5: np.ndarray
+    assy8: np.ndarray
+    keys: pd.Index          # key 编号 → 归一化 key
+    assy_vocab: pd.Index    # 组立编号 → 归一化组立（标准端按它编号，见 encode_shared）
+    order: np.ndarray       # 按 key 编号稳定排序后的下标
+    starts: np.ndarray      # 每个 key 在 order 中的起点
+    counts: np.ndarray      # 每个 key 的行数
+
+
+@dataclass
+class EncodedSides:
+    """两侧编码结果；key 编号两侧共用"""
+    std_key: np.ndarray
+    std_is_all: np.ndarray
+    pn_offsets: np.ndarray
+    pn_values: np.ndarray
+    assy_offsets: np.ndarray
+    assy_values: np.ndarray
+    sys: EncodedSys
+    n_keys: int
+
+
+def encode_sys(sys_df: pd.DataFrame, upload0_mask: pd.Series) -> EncodedSys:
+    """读取 compare 预计算的 __KEY__/__pn5/__assy8 列，编码上传=1 的行并建分组索引"""
+    pos = np.flatnonzero(~upload0_mask.to_numpy())
+    key, uniques = pd.factorize(sys_df['__KEY__'].to_numpy(dtype=object)[pos])
+    key = key.astype(np.int64)
+    counts = np.bincount(key, minlength=len(uniques))
+    assy8, assy_uniques = pd.factorize(sys_df['__assy8'].to_numpy(dtype=object)[pos])
+    return EncodedSys(
+        pos=pos,
+        key=key,
+        pn5=encode_values(sys_df['__pn5'].to_numpy()[pos], pn5_code),
+        assy8=assy8.astype(np.int64),
+        keys=pd.Index(uniques, dtype=object),
+        assy_vocab=pd.Index(assy_uniques, dtype=object),
+        order=np.argsort(key, kind='stable'),
+        starts=np.cumsum(counts) - counts,
+        counts=counts,
+    )
+
+
+def encode_sides(std_df: pd.DataFrame, sys_df: pd.DataFrame,
+                 std_is_all: np.ndarray, upload0_mask: pd.Series,
+                 sys_enc: EncodedSys = None) -> EncodedSides:
+    """
+    读取 compare 预计算的 __KEY__/__pn5_list/__assy_list 列并编码标准端；
+    sys_enc 已有时（批量比对）直接复用，不再重复编码系统端。
+    标准端独有的 key 编号排在系统端 key 之后。
+    """
+    if sys_enc is None:
+        sys_enc = encode_sys(sys_df, upload0_mask)
+
+    std_keys = std_df['__KEY__'].to_numpy(dtype=object)
+    std_key = sys_enc.keys.get_indexer(std_keys).astype(np.int64)
+    missing = std_key < 0
+    n_keys = len(sys_enc.keys)
+    if missing.any():
+        extra, extra_uniques = pd.factorize(std_keys[missing])
+        std_key[missing] = extra + n_keys
+        n_keys += len(extra_uniques)
+
+    pn_offsets, pn_values = encode_lists(std_df['__pn5_list'].to_numpy(), pn5_code)
+    assy_offsets, assy_flat = _flatten(std_df['__assy_list'].to_numpy())
+    assy_values = encode_shared(assy_flat, sys_enc.assy_vocab)
+
+    return EncodedSides(
+        std_key=std_key,
+        std_is_all=std_is_all,
+        pn_offsets=pn_offsets,
+        pn_values=pn_values,
+        assy_offsets=assy_offsets,
+        assy_values=assy_values,
+        sys=sys_enc,
+        n_keys=n_keys,
+    )
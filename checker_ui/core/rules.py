@@ -0,0 +1,177 @@
+"""
+匹配规则配置（profile）：把原来写死在 compare 里的规则做成可切换的配置文件。
+
+不同产线的规则略有差异（品番取几位、组立几位、多值分隔符、通配写法、哪些上传值算“不上传”、
+列名叫什么），以前只能各自改代码分叉维护。现在写一个 JSON（装了 PyYAML 也可用 YAML）：
+
+    {
+      "name": "L2 线",
+      "pn_length": 6,
+      "assy_length": 8,
+      "separator": "/",
+      "wildcard": "ALL",
+      "skip_upload": ["0", "否"],
+      "sys_pn_columns": ["系统品番", "PN"]
+    }
+
+未写的项取默认值（与原来的规则完全一致）。
+compile_profile() 把配置编译成 MatchPlan：各列的归一化函数（带缓存）+ 通配 / 不上传判定，
+一次编译、按配置缓存；匹配阶段仍然是整数编码后的向量化引擎，换配置不会退化成逐行解释执行。
+"""
+import json
+import os
+import re
+from dataclasses import asdict, dataclass, fields
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+# 归一化缓存上限（同 comparator.NORMALIZE_CACHE_SIZE）
+_CACHE_SIZE = 65536
+
+# 品番按 37 进制打包成 int64，再与 key 编号打包，位数受 int64 范围限制
+_MAX_PN_LENGTH = 8
+_MAX_ASSY_LENGTH = 12
+
+
+@dataclass(frozen=True)
+class MatchProfile:
+    """一套匹配规则；frozen 便于做缓存键 / 传给子进程"""
+    name: str = "默认"
+    pn_length: int = 5              # 品番：保留字母数字、转大写后取前 N 位
+    assy_length: int = 8            # 组立番号：只取数字，取前 N 位，不足左补 0
+    separator: str = "/"            # 标准端品番 / 组立的多值分隔符
+    wildcard: str = "ALL"           # 标准品番 = 该值 ⇒ 组里有上传行即 OK；空串表示不启用
+    skip_upload: tuple = ("0",)     # 上传列（去首尾空格后）为这些值 ⇒ 未比对
+    # 列名候选：调用方显式给出的列名优先，其次按顺序找第一个存在的列
+    std_key_columns: tuple = ('BC POS Name', 'BC POS', '零件名称', 'Parts Name', '__KEY__')
+    std_pn_columns: tuple = ('标准品番', 'PN', '品番（标准）')
+    std_as_columns: tuple = ('标准组立番号',)
+    sys_key_columns: tuple = ('BC POS Name', 'BC POS', '零件名称', 'Parts Name', '__KEY__')
+    sys_pn_columns: tuple = ('系统品番', 'PN', '品番（系统）')
+    sys_as_columns: tuple = ('系统组立番号', 'GP.CP./HIKI. ITEM', '组立番号')
+    upload_columns: tuple = ('上传', '是否上传')
+
+
+DEFAULT_PROFILE = MatchProfile()
+
+
+def profile_from_dict(data: dict) -> MatchProfile:
+    """dict → MatchProfile；未知项 / 不合法的取值直接报错，避免配置写错却静默按默认规则比对"""
+    known = {f.name for f in fields(MatchProfile)}
+    unknown = sorted(set(data) - known)
+    if unknown:
+        raise ValueError(f"规则配置中有未知项：{', '.join(unknown)}")
+    types = {f.name: f.type for f in fields(MatchProfile)}
+    values = {}
+    for k, v in data.items():
+        expected = types[k]
+        if expected is tuple:
+            if not isinstance(v, (list, tuple)) or not all(isinstance(x, str) for x in v):
+                raise ValueError(f"{k} 须为字符串列表")
+            values[k] = tuple(v)
+        elif expected is int:
+            if isinstance(v, bool) or not isinstance(v, int):
+                raise ValueError(f"{k} 须为整数")
+            values[k] = v
+        else:
+            if not isinstance(v, str):
+                raise ValueError(f"{k} 须为字符串")
+            values[k] = v
+    profile = MatchProfile(**values)
+    if not 1 <= int(profile.pn_length) <= _MAX_PN_LENGTH:
+        raise ValueError(f"pn_length 须在 1–{_MAX_PN_LENGTH} 之间")
+    if not 1 <= int(profile.assy_length) <= _MAX_ASSY_LENGTH:
+        raise ValueError(f"assy_length 须在 1–{_MAX_ASSY_LENGTH} 之间")
+    if not profile.separator:
+        raise ValueError("separator 不能为空")
+    return profile
+
+
+def load_profile(path: str) -> MatchProfile:
+    """读取 JSON / YAML 规则文件；未写 name 时用文件名"""
+    with open(path, encoding="utf-8") as f:
+        if path.lower().endswith((".yaml", ".yml")):
+            try:
+                import yaml
+            except ImportError:
+                raise ValueError("读取 YAML 规则需要安装 PyYAML，或改用 JSON 格式")
+            data = yaml.safe_load(f) or {}
+        else:
+            data = json.load(f)
+    if not isinstance(data, dict):
+        raise ValueError("规则文件的顶层必须是一个对象（键值对）")
+    data.setdefault("name", os.path.splitext(os.path.basename(path))[0])
+    return profile_from_dict(data)
+
+
+def save_profile(profile: MatchProfile, path: str):
+    """写出 JSON 规则文件（可作为模板修改）"""
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(asdict(profile), f, ensure_ascii=False, indent=2)
+
+
+_RE_NON_ALNUM = re.compile(r'[^0-9A-Za-z]')
+_RE_NON_DIGIT = re.compile(r'\D')
+
+
+@dataclass(frozen=True)
+class MatchPlan:
+    """编译后的规则：每列一个归一化函数（只对唯一值调用）+ 向量化的通配 / 不上传判定"""
+    profile: MatchProfile
+    pn: object          # 系统端品番 → pn_length 位
+    pn_list: object     # 标准端品番（可多值）→ [pn_length 位, ...]
+    assy: object        # 组立番号 → assy_length 位数字
+    assy_list: object   # 标准端组立（可多值）→ [assy_length 位, ...]
+
+    def wildcard_mask(self, values: pd.Series) -> np.ndarray:
+        """标准品番是否为通配（ALL）；先在唯一值上判断再回填"""
+        wildcard = self.profile.wildcard.strip().upper()
+        if not wildcard:
+            return np.zeros(len(values), dtype=bool)
+        return _unique_hits(values, lambda u: u.strip().upper() == wildcard)
+
+    def skip_mask(self, values: pd.Series) -> pd.Series:
+        """上传列为“不上传”取值的行（未比对）"""
+        skip = set(self.profile.skip_upload)
+        return pd.Series(_unique_hits(values, lambda u: u.strip() in skip), index=values.index)
+
+
+def _unique_hits(values: pd.Series, test) -> np.ndarray:
+    """
+    test(文本) 只在唯一值上调用再按 code 回填；空值不命中。
+    object 列先转文本再分组（同 comparator._map_unique），Categorical / 字符串列直接按取值分组，不展开成 object
+    """
+    keys = values.astype(str) if values.dtype == object else values
+    codes, uniques = pd.factorize(keys)
+    hits = np.fromiter((test(str(u)) for u in uniques), dtype=bool, count=len(uniques))
+    return np.append(hits, False)[codes]
+
+
+@lru_cache(maxsize=16)
+def compile_profile(profile: MatchProfile = DEFAULT_PROFILE) -> MatchPlan:
+    """按配置生成归一化函数；同一配置只编译一次，函数缓存跨多次比对共享"""
+    pn_len, assy_len, sep = int(profile.pn_length), int(profile.assy_length), profile.separator
+
+    @lru_cache(maxsize=_CACHE_SIZE)
+    def pn(p):
+        return _RE_NON_ALNUM.sub('', str(p)).upper()[:pn_len]
+
+    @lru_cache(maxsize=_CACHE_SIZE)
+    def assy(a):
+        s = _RE_NON_DIGIT.sub('', str(a))
+        return s[:assy_len] if len(s) >= assy_len else s.zfill(assy_len)
+
+    def pn_list(p):
+        if pd.isna(p):
+            return []
+        keys = [pn(seg.strip()) for seg in str(p).split(sep) if seg.strip()]
+        return keys or [""]
+
+    def assy_list(v):
+        if pd.isna(v):
+            return []
+        return [assy(seg.strip()) for seg in str(v).split(sep) if seg.strip()]
+
+    return MatchPlan(profile=profile, pn=pn, pn_list=pn_list, assy=assy, assy_list=assy_list)
@@ -0,0 +1,157 @@
+"""
+流式比对：系统文件大到无法整表装入内存时使用。
+
+标准端整表在内存里预处理一次；系统文件按块读取，每块比对后结果直接写入输出文件。
+  * 系统行的判定只取决于同 key 的标准行（与其它系统行无关），所以逐块判定就是最终结果，
+    原来“同 key 剩余行记 NG”的规则跨块同样成立
+  * 标准行是否 OK 取决于所有块：逐块累加命中，最后统一写出
+内存峰值由 chunk_rows 决定；去重只额外保留每行一个 8 字节哈希。
+"""
+import numpy as np
+import pandas as pd
+from datetime import datetime
+
+from .comparator import (
+    DEFAULT_ENGINE, STATUS_OK, _MATCHERS, _match, _prepare_std, _prepare_sys, _resolve_columns, _write_text,
+)
+from .loaders import iter_sys_chunks
+from .progress import PHASE_FINALIZE, as_tracker
+from .rules import DEFAULT_PROFILE, MatchProfile, compile_profile
+
+STREAM_CHUNK_ROWS = 50000
+
+
+def _cell_value(v):
+    """写单元格：空值留空，list 与 pandas.to_excel 一样写成文本"""
+    if isinstance(v, (list, tuple)):
+        return str(v)
+    if v is None or (isinstance(v, float) and np.isnan(v)):
+        return None
+    if isinstance(v, np.generic):
+        return v.item()
+    return v
+
+
+class _SheetStream:
+    """constant_memory 模式下按行追加写入一个工作表"""
+
+    def __init__(self, book, name, formats):
+        self.ws = book.add_worksheet(name)
+        self.formats = formats
+        self.row = 0
+        self.columns = None
+        self.ws.freeze_panes(1, 0)
+
+    def write_frame(self, df: pd.DataFrame):
+        if self.columns is None:
+            self.columns = list(df.columns)
+            self.ws.write_row(0, 0, [str(c) for c in self.columns], self.formats['header'])
+            self.row = 1
+        status = df['比对结果'].to_numpy() if '比对结果' in df.columns else None
+        for i, values in enumerate(df[self.columns].itertuples(index=False, name=None)):
+            fmt = self.formats.get(status[i]) if status is not None else None
+            self.ws.write_row(self.row, 0, [_cell_value(v) for v in values], fmt)
+            self.row += 1
+
+
+def _dedupe(chunk: pd.DataFrame, seen: np.ndarray):
+    """与 load_sys_df 的 drop_duplicates 等价：块内去重 + 与之前各块去重（只保留行哈希）"""
+    h = pd.util.hash_pandas_object(chunk, index=False).to_numpy()
+    keep = ~pd.Series(h).duplicated().to_numpy()
+    if len(seen):
+        keep &= ~np.isin(h, seen)
+    return chunk[keep], np.union1d(seen, h[keep])
+
+
+def compare_stream(std_df: pd.DataFrame, sys_path: str, out_path: str,
+                   chunk_rows: int = STREAM_CHUNK_ROWS, dedupe: bool = True,
+                   std_key_col='BC POS NAME', sys_key_col='BC POS NAME',
+                   std_pn='品番',        sys_pn='品番',
+                   std_as='组立番号',    sys_as='组立番号',
+                   upload_col='是否上传', engine: str = DEFAULT_ENGINE,
+                   profile: MatchProfile = None, progress=None, cancel=None):
+    """
+    标准表在内存，系统文件逐块读取、逐块比对并写入 out_path（xlsx）：
+      * “系统结果” 表：逐块追加
+      * “标准结果” 表：全部块处理完后写出
+    返回 (标准结果表, 统计 dict)；进度按已读行数估算，取消后输出文件不完整
+    profile: 匹配规则配置，同 compare
+    """
+    tracker = as_tracker(progress, cancel)
+    profile = profile or DEFAULT_PROFILE
+    plan = compile_profile(profile)
+    import xlsxwriter
+
+    if engine not in _MATCHERS:
+        raise ValueError(f"未知的比对引擎：{engine}")
+
+    book = xlsxwriter.Workbook(out_path, {'constant_memory': True, 'nan_inf_to_errors': True})
+    formats = {
+        'header': book.add_format({'bold': True, 'bg_color': '#E3F2FD', 'align': 'center'}),
+        'OK': book.add_format({'bg_color': '#E8F5E9'}),
+        'NG': book.add_format({'bg_color': '#FFEBEE'}),
+        '未比对': book.add_format({'bg_color': '#F5F5F5'}),
+    }
+    std_sheet = _SheetStream(book, '标准结果', formats)
+    sys_sheet = _SheetStream(book, '系统结果', formats)
+
+    std_prep = None
+    std_ok = None
+    is_all = None
+    seen = np.empty(0, dtype=np.uint64)
+    ok_sys = ng_sys = n_sys = 0
+
+    try:
+        for chunk in iter_sys_chunks(sys_path, chunk_rows, progress=tracker.sub(0, 90)):
+            if dedupe:
+                chunk, seen = _dedupe(chunk, seen)
+            if chunk.empty:
+                continue
+
+            if std_prep is None:
+                # 列名以第一块为准（各块列结构一致）
+                cols = _resolve_columns(std_df, chunk, std_key_col, sys_key_col, std_pn, sys_pn,
+                                        std_as, sys_as, upload_col, profile)
+                r_std_key, r_sys_key, r_std_pn, r_sys_pn, r_std_as, r_sys_as, r_upload = cols
+                std_prep, is_all = _prepare_std(std_df, r_std_key, r_std_pn, r_std_as, plan=plan)
+                std_ok = np.zeros(len(std_prep), dtype=bool)
+
+            sys_prep, upload0_mask = _prepare_sys(chunk, r_sys_key, r_sys_pn, r_sys_as, r_upload, plan=plan)
+            codes = _match(engine, std_prep, sys_prep, is_all, upload0_mask)
+            _write_text(std_prep, sys_prep, codes)
+
+            std_ok |= codes.std_status == STATUS_OK
+            sys_sheet.write_frame(sys_prep)
+            status = sys_prep['比对结果']
+            ok_sys += int((status == 'OK').sum())
+            ng_sys += int((status == 'NG').sum())
+            n_sys += len(sys_prep)
+
+        tracker.report(90, PHASE_FINALIZE)
+        if std_prep is None:
+            # 系统文件没有数据行：所有标准行按“组内无系统行”判定
+            r_std_key, _, r_std_pn, _, r_std_as, _, _ = _resolve_columns(
+                std_df, pd.DataFrame(columns=['BC POS NAME', '品番', '组立番号', '是否上传']),
+                std_key_col, sys_key_col, std_pn, sys_pn, std_as, sys_as, upload_col, profile)
+            std_prep, is_all = _prepare_std(std_df, r_std_key, r_std_pn, r_std_as, plan=plan)
+            std_ok = np.zeros(len(std_prep), dtype=bool)
+
+        std_prep['比对结果'] = np.where(std_ok, 'OK', 'NG').astype(object)
+        std_prep['NG原因'] = np.where(std_ok, '', np.where(is_all, '无上传=1 的系统行', '品番或组立不一致')).astype(object)
+        std_sheet.write_frame(std_prep)
+
+        summary = {
+            'std_ok': int(std_ok.sum()),
+            'std_ng': int((~std_ok).sum()),
+            'sys_ok': ok_sys,
+            'sys_ng': ng_sys,
+            'sys_rows': n_sys,
+        }
+        ws = std_sheet.ws
+        last_row = std_sheet.row + 2
+        ws.write(last_row,     0, f'导出时间: {datetime.now():%Y-%m-%d %H:%M:%S}')
+        ws.write(last_row + 1, 0, f'标准 OK: {summary["std_ok"]} / NG: {summary["std_ng"]}')
+        ws.write(last_row + 2, 0, f'系统 OK: {ok_sys} / NG: {ng_sys}')
+    finally:
+        book.close()
+    return std_prep, summary
@@ -0,0 +1,364 @@
+"""
+轻量 xlsx 读取：直接流式解析工作表 XML（zipfile + iterparse），只解码需要的列、读到需要的行为止，
+不读样式表、不建 openpyxl 的单元格对象。
+
+read_xlsx(path, header, usecols, nrows, skiprows) 的结果与
+pd.read_excel(path, header=header, nrows=nrows, skiprows=skiprows) 再取 usecols 这几列一致：
+单元格取值规则同 pandas 的 openpyxl 读取器，类型推断 / 缺失值交给同一个 TextParser。
+唯一的区别来自不读样式：日期格式的数字单元格保持为数字（loaders 用到的列都不是日期）。
+不是 xlsx（如 .xls）时退回 pd.read_excel。
+"""
+import posixpath
+import re
+import zipfile
+from datetime import datetime
+from xml.etree.ElementTree import fromstring, iterparse
+
+import numpy as np
+import pandas as pd
+from pandas.io.parsers import TextParser
+
+from .progress import NULL_TRACKER, PHASE_READ
+
+_NS_REL = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+
+
+class _CountingReader:
+    """包一层 zip 成员流，记录已读的解压后字节数（用于进度）"""
+
+    def __init__(self, raw):
+        self.raw = raw
+        self.pos = 0
+
+    def read(self, n=-1):
+        data = self.raw.read(n)
+        self.pos += len(data)
+        return data
+
+
+def _local(tag: str) -> str:
+    return tag.rsplit("}", 1)[-1]
+
+
+def _first_sheet_paths(zf: zipfile.ZipFile):
+    """→ (第一个工作表的 zip 路径, sharedStrings 的 zip 路径或 None)；按 workbook.xml 的顺序取"""
+    rels = {}
+    with zf.open("xl/_rels/workbook.xml.rels") as f:
+        for _, el in iterparse(f):
+            if _local(el.tag) == "Relationship":
+                target = el.get("Target", "")
+                target = target.lstrip("/") if target.startswith("/") else posixpath.normpath(
+                    posixpath.join("xl", target))
+                rels[el.get("Id")] = (target, el.get("Type", "").rsplit("/", 1)[-1])
+    sheet_path = None
+    with zf.open("xl/workbook.xml") as f:
+        for _, el in iterparse(f):
+            if _local(el.tag) == "sheet":
+                sheet_path = rels.get(el.get(f"{{{_NS_REL}}}id"), (None,))[0]
+                break
+    strings = next((t for t, kind in rels.values() if kind == "sharedStrings"), None)
+    names = set(zf.namelist())
+    if sheet_path not in names:
+        sheet_path = "xl/worksheets/sheet1.xml"
+    if strings not in names:
+        strings = "xl/sharedStrings.xml" if "xl/sharedStrings.xml" in names else None
+    return sheet_path, strings
+
+
+def _header_names(row) -> list:
+    """表头行 → 列名（空列名 / 重名的处理与 pd.read_excel 一致）"""
+    names, seen = [], {}
+    for i, v in enumerate(row):
+        name = f"Unnamed: {i}" if v is None else v
+        if name in seen:
+            seen[name] += 1
+            name = f"{name}.{seen[name]}"
+        else:
+            seen[name] = 0
+        names.append(name)
+    return names
+
+
+def _text_content(node, t_tag: str, r_tag: str) -> str:
+    """<si> / <is> 的纯文本：直接的 <t> + 各 <r> 里的 <t>（注音 <rPh> 不算），同 openpyxl"""
+    parts = [node.findtext(t_tag) or ""]
+    parts += [r.findtext(t_tag) or "" for r in node.findall(r_tag)]
+    return "".join(parts)
+
+
+def _read_shared_strings(zf: zipfile.ZipFile, path) -> list:
+    if path is None:
+        return []
+    out = []
+    with zf.open(path) as f:
+        ns = None
+        for event, el in iterparse(f, events=("start", "end")):
+            if ns is None:
+                ns = el.tag[:el.tag.index("}") + 1] if el.tag.startswith("{") else ""
+                si_tag, t_tag, r_tag = ns + "si", ns + "t", ns + "r"
+                continue
+            if event == "end" and el.tag == si_tag:
+                out.append(_text_content(el, t_tag, r_tag).replace("x005F_", ""))
+                el.clear()
+    return out
+
+
+_COL_CACHE = {}
+_RE_ROOT = re.compile(rb"<(?!\?|!)([\w:.-]+)[^>]*>")                 # 根元素的开始标签
+_RE_SHEET_DATA = re.compile(rb"<(\w+:)?sheetData\b[^>]*?(/?)>")
+_RE_DIMENSION = re.compile(rb"<(?:\w+:)?dimension\s+ref=\"[A-Z]*\d*:?([A-Z]*)(\d*)\"")
+
+
+def _col_index(ref: str) -> int:
+    """'AB12' → 27（0 起）"""
+    letters = ref.rstrip("0123456789")
+    idx = _COL_CACHE.get(letters)
+    if idx is None:
+        idx = 0
+        for ch in letters:
+            idx = idx * 26 + ord(ch) - 64
+        idx -= 1
+        _COL_CACHE[letters] = idx
+    return idx
+
+
+def _number(v: str):
+    """同 openpyxl 的 _cast_number + pandas 的整数化：整数值的浮点数返回 int"""
+    if "." in v or "E" in v or "e" in v:
+        f = float(v)
+        i = int(f)
+        return i if i == f else f
+    return int(v)
+
+
+class _SheetParser:
+    """单元格取值规则同 pandas._openpyxl._convert_cell（data_only，不看样式）"""
+
+    def __init__(self, ns: str, strings: list):
+        self.strings = strings
+        self.v_tag, self.is_tag = ns + "v", ns + "is"
+        self.t_tag, self.r_tag = ns + "t", ns + "r"
+
+    def value(self, c):
+        t = c.get("t", "n")
+        if t == "inlineStr":
+            node = c.find(self.is_tag)
+            return "" if node is None else _text_content(node, self.t_tag, self.r_tag)
+        v = c.findtext(self.v_tag)
+        if not v:
+            return ""
+        if t == "n":
+            return _number(v)
+        if t == "s":
+            return self.strings[int(v)]
+        if t == "str":
+            return v
+        if t == "b":
+            return bool(int(v))
+        if t == "e":
+            return np.nan
+        if t == "d":
+            return datetime.fromisoformat(v)
+        return v
+
+    def nonempty(self, c) -> bool:
+        """不需要取值的列只判断是否非空（决定表宽和末尾空行的裁剪）"""
+        if not len(c):
+            return False
+        t = c.get("t", "n")
+        if t == "inlineStr":
+            return self.value(c) != ""
+        v = c.findtext(self.v_tag)
+        if not v:
+            return False
+        return t != "s" or self.strings[int(v)] != ""
+
+
+def _row_batches(f, stats: dict, chunk_size: int = 1 << 20):
+    """
+    工作表 XML → 若干批完整的 <row> 元素（各批是一个以原根元素包起来的小文档，用 C 解析器一次解析）。
+    按 </row> 切块，避免 iterparse 逐个元素回到 Python 的开销。
+    顺带取 <dimension>（声明的已用区域）记入 stats['dimension'] = (行数, 列数)
+    """
+    buf = b""
+    root_open = root_close = None
+    in_data = False
+    while True:
+        chunk = f.read(chunk_size)
+        buf += chunk
+        if root_open is None:
+            m = _RE_ROOT.search(buf)
+            if m is None:
+                if not chunk:
+                    return
+                continue
+            root_open, root_close = m.group(0), b"</" + m.group(1) + b">"
+        if not in_data:
+            m = _RE_SHEET_DATA.search(buf)
+            if m is None:
+                if not chunk:
+                    return
+                continue
+            dim = _RE_DIMENSION.search(buf, 0, m.start())
+            if dim is not None and dim.group(2):
+                stats["dimension"] = (int(dim.group(2)), _col_index(dim.group(1).decode()) + 1)
+            if m.group(2):                                   # <sheetData/>：没有数据
+                return
+            buf = buf[m.end():]
+            row_end = b"</" + (m.group(1) or b"") + b"row>"
+            data_end = b"</" + (m.group(1) or b"") + b"sheetData>"
+            in_data = True
+        stop = buf.find(data_end)
+        if stop >= 0:
+            if stop:
+                yield fromstring(root_open + buf[:stop] + root_close)
+            return
+        cut = buf.rfind(row_end)
+        if cut >= 0:
+            cut += len(row_end)
+            yield fromstring(root_open + buf[:cut] + root_close)
+            buf = buf[cut:]
+        if not chunk:
+            return
+
+
+def _sheet_rows(zf, sheet_path, strings, wanted, rows_needed, stats, tracker):
+    """
+    逐行产出 (行号, {列号: 值}, 该行最后一个非空列号 + 1)；空行（只有格式、没有值）不产出，
+    只把最后出现的行号记入 stats['last_row']。
+    wanted: 需要取值的列号集合；None = 全部；可中途替换（读完表头再决定要哪些列）
+    """
+    info = zf.getinfo(sheet_path)
+    cache = _COL_CACHE
+    with zf.open(info) as raw:
+        f = _CountingReader(raw)
+        parser = None
+        row_idx = -1
+        for batch in _row_batches(f, stats):
+            if parser is None:
+                ns = batch.tag[:batch.tag.index("}") + 1] if batch.tag.startswith("{") else ""
+                row_tag, c_tag, v_tag, is_tag = ns + "row", ns + "c", ns + "v", ns + "is"
+                parser = _SheetParser(ns, strings)
+            for el in batch:
+                if el.tag != row_tag:
+                    continue
+                r = el.get("r")
+                row_idx = int(r) - 1 if r else row_idx + 1
+                if rows_needed is not None and row_idx >= rows_needed:
+                    return
+                stats["last_row"] = row_idx
+                # 只带格式的空行（用过的区域远超实际数据时占绝大多数）：不逐个单元格处理
+                if next(el.iter(v_tag), None) is None and next(el.iter(is_tag), None) is None:
+                    continue
+                keep = wanted[0]
+                values, cells, col = {}, [], -1
+                for c in el:
+                    if c.tag != c_tag:
+                        continue
+                    ref = c.get("r")
+                    if ref:
+                        col = cache.get(ref.rstrip("0123456789"))
+                        if col is None:
+                            col = _col_index(ref)
+                    else:
+                        col += 1
+                    cells.append((col, c))
+                    if keep is None or col in keep:
+                        v = parser.value(c)
+                        if v != "":
+                            values[col] = v
+                # 行宽 = 最后一个非空单元格；从行尾往回找，通常第一个就是
+                width = 0
+                for col, c in reversed(cells):
+                    if col in values or ((keep is not None and col not in keep) and parser.nonempty(c)):
+                        width = col + 1
+                        break
+                if width:
+                    yield row_idx, values, width
+            tracker.report(100 * f.pos / max(info.file_size, 1), PHASE_READ)
+
+
+def read_xlsx(path: str, header=None, usecols=None, nrows: int = None, skiprows: int = 0,
+              tracker=NULL_TRACKER) -> pd.DataFrame:
+    """
+    读取第一个工作表。
+      skiprows: 先跳过工作表开头的这么多行（之后的行号、header 都从跳过后算起）
+      header : None 或 0（第一行作表头，列名规则同 read_excel：空 → 'Unnamed: i'，重名加 .1）
+      usecols: None = 全部列；列号序列；或 callable(列名列表) → 列号序列（header=0 时读完表头再决定）
+      nrows  : 只读表头之后的前 nrows 行（到此即停止解析）
+    header=None 时列名是原列号；超出实际表宽的列号不出现在结果里（与 read_excel 一致）。
+    结果的 attrs：
+      source_columns: 各列在原表中的列号
+      phantom_rows / phantom_cols: 已用区域（<dimension> 或 XML 里出现的行）超出实际数据的空行 / 空列数，
+                                   这些行读的时候就跳过了，不会先建成空行再删
+    """
+    if not zipfile.is_zipfile(path):
+        df = pd.read_excel(path, header=header, nrows=nrows, skiprows=skiprows)
+        if usecols is None:
+            return df
+        cols = usecols(list(df.columns)) if callable(usecols) else usecols
+        positions = [c for c in sorted(set(cols)) if c < df.shape[1]]
+        df = df.iloc[:, positions]
+        df.attrs["source_columns"] = positions
+        return df
+
+    # 与 read_excel 相同：header=None 时也多读一行（表宽按读到的行算）
+    header_rows = 1 if header is None else header + 1
+    rows_needed = None if nrows is None else skiprows + header_rows + nrows
+    fixed = None if usecols is None or callable(usecols) else sorted(set(usecols))
+    # 表头行总是整行解码（列名要看全部列）
+    wanted = [None if header is not None else (None if fixed is None else set(fixed))]
+
+    data, header_values, cols = [], {}, fixed
+    last_data, width = skiprows - 1, 0
+    stats = {"last_row": -1}
+    with zipfile.ZipFile(path) as zf:
+        sheet_path, strings_path = _first_sheet_paths(zf)
+        strings = _read_shared_strings(zf, strings_path)
+        tracker.check()
+        for row_idx, values, row_width in _sheet_rows(zf, sheet_path, strings, wanted, rows_needed, stats,
+                                                      tracker):
+            width = max(width, row_width)                # 表宽也算跳过的行（同 read_excel）
+            if row_idx < skiprows:
+                continue
+            last_data = row_idx
+            row_idx -= skiprows
+            while len(data) < row_idx:
+                data.append({})                      # 中间的空行；末尾的空行永远不会建出来
+            data.append(values)
+            if header is not None and row_idx == header:
+                header_values = values
+                if callable(usecols):
+                    cols = usecols(_header_names([values.get(i) for i in range(row_width)]))
+                wanted[0] = None if cols is None else set(cols)
+
+    dim_rows, dim_cols = stats.get("dimension", (0, 0))
+    if nrows is not None:
+        dim_rows = min(dim_rows, rows_needed)
+    phantom = {"phantom_rows": max(max(dim_rows, stats["last_row"] + 1) - (last_data + 1), 0),
+               "phantom_cols": max(dim_cols - width, 0)}
+    if header is not None:
+        if len(data) <= header:
+            df = pd.DataFrame()
+            df.attrs.update(phantom)
+            return df
+        names = _header_names([header_values.get(i) for i in range(width)])
+        if callable(usecols) and wanted[0] is None:
+            cols = usecols(names)                    # 表头行是空行：读完再决定
+        data = data[header + 1:]
+    else:
+        names = list(range(width))
+    if nrows is not None:
+        data = data[:nrows]
+    positions = list(range(width)) if cols is None else [c for c in sorted(set(cols)) if c < width]
+
+    rows = [[row.get(c, "") for c in positions] for row in data]
+    labels = [names[c] for c in positions]
+    if rows:
+        df = TextParser(rows, names=labels, header=None, skip_blank_lines=False).read()
+    else:
+        df = pd.DataFrame(columns=labels)
+    df.attrs["source_columns"] = positions
+    df.attrs.update(phantom)
+    return df
+
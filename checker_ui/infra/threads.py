@@ -6,7 +6,7 @@ class WorkerSignals(QObject):
     finished = Signal()
     error = Signal(str)
     result = Signal(object)
-    progress = Signal(int)
+    progress = Signal(int, str)  # (百分比, 阶段)
 
 class Worker(QRunnable):
     def __init__(self, fn, *args, **kwargs):
@@ -11,6 +11,7 @@
 import os
 import sys
 import datetime, tempfile, atexit
+import multiprocessing
 
 # —— 关键：当以脚本直接运行时，补齐包路径 —— #
 if __name__ == "__main__" and (__package__ is None or __package__ == ""):
@@ -104,6 +105,8 @@ class EntryWindow(QMainWindow):
 
 
 def main():
+    # 打包后（PyInstaller）子进程需要这一步，否则并行比对会重复拉起主窗口
+    multiprocessing.freeze_support()
     app = QApplication(sys.argv)
     win = EntryWindow()
     win.show()
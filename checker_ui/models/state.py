@@ -1,5 +1,5 @@
 from dataclasses import dataclass, field
-from typing import Optional, Dict, List
+from typing import Optional, Dict, List, Any
 import pandas as pd
 
 @dataclass
@@ -8,4 +8,10 @@ class AppState:
     sys_df: Optional[pd.DataFrame] = None
     result_df: Optional[pd.DataFrame] = None
     visible_cols: List[str] = field(default_factory=list)
-    meta: Dict[str, str] = field(default_factory=dict)
\ No newline at end of file
+    meta: Dict[str, str] = field(default_factory=dict)
+    # 上次比对的 key 组指纹与结果（core.incremental.CompareMemo），用于增量重比对
+    compare_memo: Optional[Any] = None
+    # copy-free 比对结果（core.comparator.CompareResult），与 std_df / sys_df 按行号对齐
+    compare_result: Optional[Any] = None
+    # 当前匹配规则配置（core.rules.MatchProfile）；None = 默认规则
+    profile: Optional[Any] = None
\ No newline at end of file
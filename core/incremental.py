@@ -0,0 +1,233 @@
+"""
+增量比对：只重算输入发生变化的 key 组。
+
+典型流程是“比对 → 改几行系统数据 → 重新导出 → 再比对”。每个 __KEY__ 的判定只依赖
+本组的标准行和系统行，因此对每组的相关列做指纹（行哈希 + 组内序号），下次比对时：
+  * 指纹没变的组直接沿用上次的结果（按组内序号对齐）
+  * 指纹变了 / 新出现的组才重新走 compare
+上次的指纹和结果保存在 CompareMemo 里（挂在 AppState 上）；结果走 copy-free 模式，
+memo 里只有每行的状态 / 原因数组，不保留整表副本。
+"""
+from dataclasses import dataclass
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from .comparator import (
+    DEFAULT_ENGINE, CompareResult, MatchLinks, attach_suggestions, compare_results, mark_orphans, _map_unique, _normalize_key,
+    _resolve_columns,
+)
+from .progress import PHASE_FINALIZE, PHASE_INDEX, as_tracker
+from .rules import DEFAULT_PROFILE
+
+_RANK_SALT = np.uint64(0x9E3779B97F4A7C15)
+
+
+@dataclass
+class _SideMemo:
+    """一侧的上次结果：状态 / 原因数组 + 按 (key, 组内序号) 定位行号的查找结构"""
+    status: np.ndarray
+    reason: np.ndarray
+    keys: pd.Index          # 上次出现过的 key（唯一值）
+    order: np.ndarray       # 按 key 编号稳定排序后的行号
+    starts: np.ndarray      # 每个 key 在 order 中的起点
+    near_rank: np.ndarray = None   # 标准端：最接近的系统行在其 key 组内的序号（-1 = 无）
+    diff: np.ndarray = None
+
+
+@dataclass
+class CompareMemo:
+    """上一次比对的指纹与结果；options（识别出的列名）变化时整体失效"""
+    options: Optional[tuple] = None
+    fingerprints: Optional[pd.DataFrame] = None   # index=key，列 std_fp/std_n/sys_fp/sys_n
+    std: Optional[_SideMemo] = None
+    sys: Optional[_SideMemo] = None
+    links: Optional[MatchLinks] = None            # 上次的命中对（按上次的行号）
+    recomputed_keys: int = 0                      # 最近一次实际重算的 key 组数（统计用）
+    total_keys: int = 0
+
+    def clear(self):
+        self.options = self.fingerprints = self.std = self.sys = self.links = None
+        self.recomputed_keys = self.total_keys = 0
+
+
+def _remap(pos: np.ndarray, table: np.ndarray) -> np.ndarray:
+    """table[pos]，-1 保持不变"""
+    out = np.full(len(pos), -1, dtype=np.int64)
+    found = pos >= 0
+    out[found] = table[pos[found]]
+    return out
+
+
+class _Groups:
+    """一侧的 key 分组：编号、组内序号、按组排序后的行号"""
+
+    def __init__(self, keys: pd.Series):
+        self.codes, uniques = pd.factorize(keys.to_numpy(dtype=object))
+        self.keys = pd.Index(uniques, dtype=object)
+        counts = np.bincount(self.codes, minlength=len(uniques))
+        self.starts = np.cumsum(counts) - counts
+        self.order = np.argsort(self.codes, kind='stable')
+        self.rank = np.empty(len(self.codes), dtype=np.int64)
+        self.rank[self.order] = np.arange(len(self.codes)) - self.starts[self.codes[self.order]]
+        self.counts = counts
+
+    def fingerprints(self, df: pd.DataFrame, cols, prefix: str) -> pd.DataFrame:
+        """按 key 汇总行哈希；混入组内序号，行顺序变化也能识别"""
+        # categorize=False：直接逐格哈希，比先 factorize 再哈希唯一值快一倍（这几列重复不多）
+        row_hash = pd.util.hash_pandas_object(df[list(cols)], index=False, categorize=False).to_numpy()
+        mixed = pd.util.hash_array(row_hash ^ (self.rank.astype(np.uint64) * _RANK_SALT))
+        fp = np.zeros(len(self.keys), dtype=np.uint64)
+        np.add.at(fp, self.codes, mixed)  # uint64 溢出回绕，顺序无关的组合
+        return pd.DataFrame({f'{prefix}_fp': fp, f'{prefix}_n': self.counts}, index=self.keys)
+
+    def memo(self, status: np.ndarray, reason: np.ndarray, near_rank=None, diff=None) -> _SideMemo:
+        return _SideMemo(status=status, reason=reason, keys=self.keys, order=self.order, starts=self.starts,
+                         near_rank=near_rank, diff=diff)
+
+    def to_rank(self, pos: np.ndarray) -> np.ndarray:
+        """行号（-1 = 无）→ 组内序号"""
+        return _remap(pos, self.rank)
+
+    def orphans(self, other: "_Groups"):
+        """本侧行的 key 不在另一侧 → 掩码；只在两侧的唯一 key 上查找（同 comparator._orphans 的对应部分）"""
+        missing = other.keys.get_indexer(self.keys) < 0
+        return missing[self.codes], int(missing.sum())
+
+    def to_pos(self, keys: pd.Index, codes: np.ndarray, rank: np.ndarray) -> np.ndarray:
+        """(另一侧的 key 编号, 本侧组内序号) → 本侧行号；-1 保持不变"""
+        found = rank >= 0
+        pos = np.full(len(rank), -1, dtype=np.int64)
+        own = self.keys.get_indexer(keys)[codes[found]]
+        pos[found] = self.order[self.starts[own] + rank[found]]
+        return pos
+
+
+def _splice(groups: _Groups, fresh_mask, fresh, prev: _SideMemo, prev_arrays):
+    """
+    重算行取 fresh（与 prev_arrays 一一对应的数组元组），其余行按 (key, 组内序号)
+    直接定位到上次结果的行号取值。
+    返回 (拼好的数组列表, 上次行号 → 本次行号（未沿用的为 -1）)
+    """
+    n = len(groups.codes)
+    out = [np.empty(n, dtype=a.dtype) for a in prev_arrays]
+    fresh_pos = np.flatnonzero(fresh_mask)
+    reuse_pos = np.flatnonzero(~fresh_mask)
+    new_of_prev = np.full(len(prev.status), -1, dtype=np.int64)
+
+    if len(fresh_pos):
+        for a, f in zip(out, fresh):
+            a[fresh_pos] = f
+    if len(reuse_pos):
+        # 只在唯一 key 上做一次字符串查找，其余全是整数运算
+        prev_code = prev.keys.get_indexer(groups.keys)[groups.codes[reuse_pos]]
+        prev_pos = prev.order[prev.starts[prev_code] + groups.rank[reuse_pos]]
+        for a, p in zip(out, prev_arrays):
+            a[reuse_pos] = p[prev_pos]
+        new_of_prev[prev_pos] = reuse_pos
+    return out, new_of_prev
+
+
+def _splice_links(prev: MatchLinks, std_new_of_prev, sys_new_of_prev, fresh: MatchLinks, std_mask, sys_mask):
+    """
+    命中对只在同一 key 组内：沿用组的命中对按上次 → 本次行号映射，重算组的命中对从子集行号映射回整表
+    """
+    s, y = prev.pairs()
+    s, y = std_new_of_prev[s], sys_new_of_prev[y]
+    keep = (s >= 0) & (y >= 0)
+    std_rows, sys_rows = [s[keep]], [y[keep]]
+    if fresh is not None:
+        fs, fy = fresh.pairs()
+        std_rows.append(np.flatnonzero(std_mask)[fs])
+        sys_rows.append(np.flatnonzero(sys_mask)[fy])
+    return MatchLinks.from_pairs(np.concatenate(std_rows), np.concatenate(sys_rows), len(std_mask), len(sys_mask))
+
+
+def compare_incremental(std_df: pd.DataFrame, sys_df: pd.DataFrame, memo: CompareMemo,
+                        std_key_col='BC POS NAME', sys_key_col='BC POS NAME',
+                        std_pn='品番',        sys_pn='品番',
+                        std_as='组立番号',    sys_as='组立番号',
+                        upload_col='是否上传', engine: str = DEFAULT_ENGINE, workers: int = 1,
+                        suggest: bool = False, profile=None, progress=None, cancel=None):
+    """
+    与 compare_results 返回相同的 CompareResult，但只重算指纹变化的 key 组；memo 原地更新。
+    首次比对、或列名映射变化时退化为完整比对。
+    suggest / profile 同 compare_results；近似 key 建议总是按整表重算（不进 memo）；
+    规则配置变化时 memo 整体失效。
+    progress / cancel 同 compare；被取消时 memo 保持上一次的状态。
+    """
+    tracker = as_tracker(progress, cancel)
+    kwargs = dict(std_key_col=std_key_col, sys_key_col=sys_key_col, std_pn=std_pn, sys_pn=sys_pn,
+                  std_as=std_as, sys_as=sys_as, upload_col=upload_col, engine=engine, workers=workers,
+                  profile=profile or DEFAULT_PROFILE)
+    cols = _resolve_columns(std_df, sys_df, std_key_col, sys_key_col, std_pn, sys_pn, std_as, sys_as, upload_col,
+                            kwargs['profile'])
+    r_std_key, r_sys_key, r_std_pn, r_sys_pn, r_std_as, r_sys_as, r_upload = cols
+    options = (cols, kwargs['profile'])
+
+    tracker.report(0, PHASE_INDEX)
+    std_keys = _map_unique(std_df[r_std_key], _normalize_key, tracker)
+    sys_keys = _map_unique(sys_df[r_sys_key], _normalize_key, tracker)
+    std_groups, sys_groups = _Groups(std_keys), _Groups(sys_keys)
+    std_fp = std_groups.fingerprints(std_df, [r_std_key, r_std_pn, r_std_as], 'std')
+    sys_fp = sys_groups.fingerprints(sys_df, [r_sys_key, r_sys_pn, r_sys_as, r_upload], 'sys')
+    all_keys = std_fp.index.append(sys_fp.index).unique()
+    fingerprints = pd.concat([std_fp.reindex(all_keys, fill_value=0),
+                              sys_fp.reindex(all_keys, fill_value=0)], axis=1).astype(np.uint64)
+
+    tracker.report(10, PHASE_INDEX)
+
+    if memo.options != options or memo.fingerprints is None:
+        result = compare_results(std_df, sys_df, progress=tracker.sub(10, 95), **kwargs)
+        changed_count = len(fingerprints)
+    else:
+        # 新出现的 key 补 0：当前组至少一侧行数 > 0，必然判为变化
+        prev = memo.fingerprints.reindex(fingerprints.index, fill_value=0)
+        same = (prev == fingerprints).all(axis=1).to_numpy()
+        changed = fingerprints.index[~same]
+        changed_count = len(changed)
+
+        std_mask = std_groups.keys.isin(changed)[std_groups.codes]
+        sys_mask = sys_groups.keys.isin(changed)[sys_groups.codes]
+        fresh = None
+        if changed_count:
+            fresh = compare_results(std_df[std_mask], sys_df[sys_mask], progress=tracker.sub(10, 95), **kwargs)
+        tracker.report(95, PHASE_FINALIZE)
+
+        std_prev = [memo.std.status, memo.std.reason]
+        std_fresh = (fresh.std_status, fresh.std_reason) if fresh else None
+        # 不一致说明：最接近的系统行按 (key, 系统组内序号) 保存，系统表行号变了也能对上
+        explained = memo.std.near_rank is not None and (fresh is None or fresh.std_near is not None)
+        if explained:
+            std_prev += [memo.std.near_rank, memo.std.diff]
+            if fresh:
+                fresh_near = _remap(fresh.std_near, np.flatnonzero(sys_mask))
+                std_fresh += (sys_groups.to_rank(fresh_near), fresh.std_diff)
+        std_arrays, std_new_of_prev = _splice(std_groups, std_mask, std_fresh, memo.std, std_prev)
+        (sys_status, sys_reason), sys_new_of_prev = _splice(
+            sys_groups, sys_mask, (fresh.sys_status, fresh.sys_reason) if fresh else None,
+            memo.sys, [memo.sys.status, memo.sys.reason])
+        result = CompareResult(std_arrays[0], std_arrays[1], sys_status, sys_reason)
+        if explained:
+            result.std_near = sys_groups.to_pos(std_groups.keys, std_groups.codes, std_arrays[2])
+            result.std_diff = std_arrays[3]
+        if memo.links is not None and (fresh is None or fresh.links is not None):
+            result.links = _splice_links(memo.links, std_new_of_prev, sys_new_of_prev,
+                                         fresh.links if fresh else None, std_mask, sys_mask)
+        # 孤立标记只取决于 key 是否在另一侧出现：用两侧已有的分组在唯一 key 上重做 anti-join
+        (std_orphan, n_orphan_keys), (sys_orphan, _) = std_groups.orphans(sys_groups), sys_groups.orphans(std_groups)
+        result = mark_orphans(result, std_keys, sys_keys, orphans=(std_orphan, sys_orphan, n_orphan_keys))
+
+    if suggest:
+        attach_suggestions(result, std_keys, sys_keys, tracker)
+    tracker.report(100, PHASE_FINALIZE)
+    memo.options = options
+    memo.fingerprints = fingerprints
+    near_rank = sys_groups.to_rank(result.std_near) if result.std_near is not None else None
+    memo.std = std_groups.memo(result.std_status, result.std_reason, near_rank, result.std_diff)
+    memo.sys = sys_groups.memo(result.sys_status, result.sys_reason)
+    memo.links = result.links
+    memo.recomputed_keys = changed_count
+    memo.total_keys = len(fingerprints)
+    return result
@@ -0,0 +1,127 @@
+"""
+近似 key 建议：标准 key 在系统端找不到完全一致的 key 时，给出最像的几个系统 key。
+
+很多 NG 其实是 BC POS NAME 的错字 / 空格差异（_normalize_key 只统一大小写和全角半角）。
+相似度 = 字符三元组集合的 Jaccard 系数（首尾补空格，与 pg_trgm 相同）。
+  * 系统端唯一 key 建一次三元组倒排表（CSR：三元组 → key 编号）
+  * 查询按块向量化：倒排表展开成 (查询, key) 对，np.unique 计数得到共有三元组数
+  * 召回只用每个查询最稀有的几个三元组，出现在大量 key 里的高频三元组只参与最终打分，
+    避免展开量爆炸
+  * 召回的少量候选再用集合精确打分，取前 top_k
+不做两两比较；只查询系统端缺失的标准 key，开销与缺失 key 数成正比。
+"""
+from itertools import chain
+
+import numpy as np
+import pandas as pd
+
+from .progress import NULL_TRACKER
+
+SUGGEST_TOP_K = 3
+SUGGEST_MIN_SCORE = 0.4
+SUGGEST_COLUMNS = ['标准 key', '建议 key', '相似度']
+
+_MAX_DF_RATIO = 0.02   # 出现在超过 2% 的 key 里的三元组不参与召回
+_MIN_MAX_DF = 64
+_PROBE = 6            # 每个查询只用最稀有的 _PROBE 个三元组召回
+_RECALL = 8            # 每个查询召回 top_k × _RECALL 个候选再精确打分
+_BLOCK = 1024          # 每块查询数（控制展开后的内存）
+
+
+def _trigrams(s: str) -> set:
+    padded = f"  {s} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _rank(sorted_ids):
+    """已排序编号数组中每个元素在本组内的序号（0 起）"""
+    n = len(sorted_ids)
+    starts = np.flatnonzero(np.r_[True, sorted_ids[1:] != sorted_ids[:-1]]) if n else np.empty(0, dtype=np.int64)
+    return np.arange(n) - np.repeat(starts, np.diff(np.r_[starts, n]))
+
+
+class TrigramIndex:
+    """系统端唯一 key 的三元组倒排表"""
+
+    def __init__(self, keys):
+        self.keys = pd.Index(pd.unique(np.asarray(list(keys), dtype=object)), dtype=object)
+        self.grams = [_trigrams(k) for k in self.keys]
+        self.sizes = np.fromiter(map(len, self.grams), dtype=np.int64, count=len(self.grams))
+
+        gram_codes, vocab = pd.factorize(np.fromiter(chain.from_iterable(self.grams), dtype=object,
+                                                          count=int(self.sizes.sum())))
+        self.vocab = pd.Index(vocab, dtype=object)
+        key_ids = np.repeat(np.arange(len(self.keys)), self.sizes)
+        order = np.argsort(gram_codes, kind='stable')
+        self.postings = key_ids[order]
+        self.df = np.bincount(gram_codes, minlength=len(self.vocab))
+        self.offsets = np.zeros(len(self.vocab) + 1, dtype=np.int64)
+        np.cumsum(self.df, out=self.offsets[1:])
+        self.max_df = max(_MIN_MAX_DF, int(len(self.keys) * _MAX_DF_RATIO))
+
+    def _recall(self, q_grams, n_cand):
+        """一块查询 → 每个查询按低频三元组共有数排序的前 n_cand 个候选 (查询号, key 编号)"""
+        n_q = len(q_grams)
+        sizes = np.fromiter(map(len, q_grams), dtype=np.int64, count=n_q)
+        gid = self.vocab.get_indexer(np.fromiter(chain.from_iterable(q_grams), dtype=object,
+                                                 count=int(sizes.sum())))
+        qi = np.repeat(np.arange(n_q), sizes)
+        keep = gid >= 0
+        qi, gid = qi[keep], gid[keep]
+        # 全由高频三元组组成的短 key 只能放开限制（这类查询很少）
+        df = self.df[gid]
+        rare = df <= self.max_df
+        has_rare = np.bincount(qi[rare], minlength=n_q) > 0
+        keep = rare | ~has_rare[qi]
+        qi, gid, df = qi[keep], gid[keep], df[keep]
+        order = np.lexsort((df, qi))
+        qi, gid = qi[order], gid[order]
+        keep = _rank(qi) < _PROBE
+        qi, gid = qi[keep], gid[keep]
+        if not len(gid):
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+
+        lens = self.df[gid]
+        pair_q = np.repeat(qi, lens)
+        within = np.arange(lens.sum()) - np.repeat(np.cumsum(lens) - lens, lens)
+        pair_key = self.postings[np.repeat(self.offsets[gid], lens) + within]
+
+        pairs, counts = np.unique(pair_q * len(self.keys) + pair_key, return_counts=True)
+        cand_q, cand_key = np.divmod(pairs, len(self.keys))
+        order = np.lexsort((-counts, cand_q))
+        cand_q, cand_key = cand_q[order], cand_key[order]
+        top = _rank(cand_q) < n_cand
+        return cand_q[top], cand_key[top]
+
+    def query(self, queries, top_k: int = SUGGEST_TOP_K, min_score: float = SUGGEST_MIN_SCORE,
+              tracker=NULL_TRACKER) -> pd.DataFrame:
+        """每个查询取相似度 >= min_score 的前 top_k 个 key；返回长表 [标准 key, 建议 key, 相似度]"""
+        queries = list(queries)
+        rows = []
+        for b in range(0, len(queries), _BLOCK):
+            tracker.check()
+            block = queries[b:b + _BLOCK]
+            q_grams = [_trigrams(q) for q in block]
+            cand_q, cand_key = self._recall(q_grams, top_k * _RECALL)
+            for i, k in zip(cand_q.tolist(), cand_key.tolist()):
+                inter = len(q_grams[i] & self.grams[k])
+                score = inter / (len(q_grams[i]) + self.sizes[k] - inter)
+                if score >= min_score:
+                    rows.append((block[i], self.keys[k], round(float(score), 3)))
+
+        out = pd.DataFrame(rows, columns=SUGGEST_COLUMNS)
+        out = out.sort_values(['标准 key', '相似度'], ascending=[True, False], kind='stable')
+        return out.groupby('标准 key', sort=False).head(top_k).reset_index(drop=True)
+
+
+def suggest_keys(std_keys, sys_keys, top_k: int = SUGGEST_TOP_K,
+                 min_score: float = SUGGEST_MIN_SCORE, tracker=NULL_TRACKER) -> pd.DataFrame:
+    """std_keys 中系统端没有的（归一化）key → 最像的系统 key"""
+    std_unique = pd.unique(np.asarray(std_keys, dtype=object))
+    sys_unique = pd.Index(pd.unique(np.asarray(sys_keys, dtype=object)), dtype=object)
+    missing = std_unique[~pd.Index(std_unique).isin(sys_unique)]
+    if not len(missing) or not len(sys_unique):
+        return pd.DataFrame(columns=SUGGEST_COLUMNS)
+    index = TrigramIndex(sys_unique)
+    tracker.check()
+    return index.query(missing, top_k, min_score, tracker)
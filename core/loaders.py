@@ -1,8 +1,25 @@
+import multiprocessing
+import numpy as np
 import pandas as pd
 import re
+from concurrent.futures import ProcessPoolExecutor
+from queue import Empty
 
-HEADER_ROW_STD = 16  # 0-based：第 17 行
+from .progress import NULL_TRACKER, PHASE_NORMALIZE, PHASE_READ, CompareCancelled, as_tracker
+from .xlsxreader import _header_names, read_xlsx
+
+HEADER_ROW_STD = 16  # 0-based：第 17 行（探测不到表头时的兜底）
 USE_COLS_STD = 12
+# 表头探测：只读前 HEADER_PROBE_ROWS 行，命中这些列名最多（且至少 2 个）的行作表头
+HEADER_PROBE_ROWS = 50
+STD_HEADER_HINTS = ("BC POS NAME", "Parts Name", "品番", "组立番号", "最终判定")
+
+# 紧凑列类型（load_*_df 的 dtypes 参数）：None = 原样；category 适用于唯一值不超过行数这一比例的文本列
+COMPACT_DTYPES = ("category", "arrow")
+CATEGORY_MAX_RATIO = 0.5
+
+# 读取 / 清洗规则变化时递增（已解析表的磁盘缓存据此失效）
+LOADER_VERSION = "4"
 
 
 def _num2str(x):
@@ -14,6 +31,51 @@ def _num2str(x):
     return s
 
 
+def _text_column(series: pd.Series) -> pd.Series:
+    """
+    整列版的 series.map(_num2str).fillna("")，结果逐个单元格一致：
+      * 整数 / 布尔列直接转文本；
+      * 浮点列（整数列里夹了空单元格就会变成浮点）：非负的整数值按整数格式化，不经过 "123.0" 再去掉 ".0"；
+      * 文本 / 混合列：只对以 ".0" 结尾的值做 \\d+\\.0 判断
+    日期等其他类型仍逐个调用 _num2str
+    """
+    kind = series.dtype.kind
+    if series.empty:
+        return series.map(_num2str).fillna("")
+    if kind in "iub":
+        return series.astype(str)
+    if kind == "f":
+        values = series.to_numpy()
+        integral = (values >= 0) & (values < 1e16) & (np.mod(values, 1) == 0) & ~np.signbit(values)
+        out = series.astype(str).astype(object)
+        out[integral] = values[integral].astype(np.int64).astype(str)
+        out[series.isna()] = ""
+        return out.astype(str)
+    if kind not in "OUT" and not isinstance(series.dtype, pd.StringDtype):
+        return series.map(_num2str).fillna("")
+    na = series.isna()
+    out = series.astype(str)
+    tail = out.str.endswith(".0", na=False)
+    if tail.any():
+        fix = tail & out.str.fullmatch(r"\d+\.0", na=False)
+        out = out.where(~fix, out.str[:-2])
+    return out.where(~na, "")
+
+
+def _cells_equal(series: pd.Series, text: str, pattern: bool = False) -> np.ndarray:
+    """
+    各行 str(值).strip() 是否等于 text（pattern=True 时按忽略大小写的正则整串匹配）。
+    只对去重后的值做字符串处理，空值不算命中
+    """
+    codes, uniques = pd.factorize(series)
+    if pattern:
+        rx = re.compile(text, re.IGNORECASE)
+        hits = np.fromiter((rx.fullmatch(str(u).strip()) is not None for u in uniques), bool, len(uniques))
+    else:
+        hits = np.fromiter((str(u).strip() == text for u in uniques), bool, len(uniques))
+    return np.append(hits, False)[codes]
+
+
 # 删除“看起来像表头”的数据行
 def _drop_header_like_rows(df):
     """
@@ -21,22 +83,21 @@ def _drop_header_like_rows(df):
     条件：整行文本和列名一致的匹配数 >= 2；
     以及命中特定列等于列名（如 "BC POS" / "BC POS NAME"）。
     """
-    import pandas as pd
     if df is None or df.empty:
         return df
 
-    # 标准化：全部转字符串并去前后空格
-    cols = pd.Index([str(c).strip() for c in df.columns])
-    df_str = df.astype(str).apply(lambda s: s.str.strip())
+    names = [str(c).strip() for c in df.columns]
 
-    # 1) 通用规则：逐列比较，等于列名的计数≥2 视为伪表头
-    eq_counts = df_str.eq(cols, axis=1).sum(axis=1)
+    # 1) 通用规则：逐列比较（值与列名都去前后空格），等于列名的计数≥2 视为伪表头
+    eq_counts = np.zeros(len(df), dtype=np.int64)
+    for i, name in enumerate(names):
+        eq_counts += _cells_equal(df.iloc[:, i], name)
     mask_header_like = eq_counts >= 2
 
     # 2) 兜底：明确针对这些列与其列名完全相等的行
     for col in ["BC POS", "BC POS NAME"]:
-        if col in df_str.columns:
-            mask_header_like |= df_str[col].str.fullmatch(col, case=False, na=False)
+        for i in np.flatnonzero(df.columns == col):
+            mask_header_like |= _cells_equal(df.iloc[:, i], col, pattern=True)
 
     # 过滤掉伪表头
     cleaned = df.loc[~mask_header_like].copy()
@@ -44,16 +105,73 @@ def _drop_header_like_rows(df):
     cleaned = cleaned.dropna(how="all")
     return cleaned
 
-def load_std_df(path: str) -> pd.DataFrame:
+def _detect_header(path: str, hints, default_row: int, tracker=NULL_TRACKER) -> int:
+    """
+    探测表头所在行（0-based）。
+    只读前 HEADER_PROBE_ROWS 行、前 USE_COLS_STD 列（与正式读取同一范围），每行按命中 hints 的列名个数打分
+    （忽略大小写 / 前后空格），取得分最高的第一行；没有任何行命中 2 个以上时返回 default_row
+    """
+    probe = read_xlsx(path, header=None, usecols=range(USE_COLS_STD), nrows=HEADER_PROBE_ROWS,
+                      tracker=tracker)
+    wanted = {h.upper() for h in hints}
+    best_score, best = 1, default_row
+    # 逐行遍历 numpy 数组：itertuples 每列都会复制一次 attrs
+    for i, row in enumerate(probe.to_numpy(dtype=object)):
+        score = len({text for text in (str(v).strip().upper() for v in row if pd.notna(v)) if text in wanted})
+        if score > best_score:
+            best_score, best = score, i
+    return best
+
+
+def compact_frame(df: pd.DataFrame, dtypes: str = "category") -> pd.DataFrame:
+    """
+    文本列换成省内存的类型（返回新表，attrs 保留；比对 / 表格显示 / 导出都直接支持这些类型）：
+      category: 取值重复多的列（唯一值 ≤ 行数 × CATEGORY_MAX_RATIO，如 是否上传 / BC POS / 组立番号）转 Categorical
+      arrow   : 全是字符串的列转 pyarrow 存储的字符串列（空值仍为 NaN），需安装 pyarrow
+    """
+    if dtypes not in COMPACT_DTYPES:
+        raise ValueError(f"未知的列类型：{dtypes}（可选 {', '.join(COMPACT_DTYPES)}）")
+    if dtypes == "arrow":
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            raise ValueError("arrow 字符串列需要安装 pyarrow")
+        try:
+            target = pd.StringDtype("pyarrow", na_value=np.nan)
+        except TypeError:                   # pandas 2.2：同样语义的类型叫 pyarrow_numpy
+            target = pd.StringDtype("pyarrow_numpy")
+    out = df.copy(deep=False)
+    for i, col in enumerate(df.columns):
+        s = df.iloc[:, i]
+        if not (s.dtype == object or isinstance(s.dtype, pd.StringDtype)):
+            continue
+        if dtypes == "category":
+            if s.nunique(dropna=True) <= len(s) * CATEGORY_MAX_RATIO:
+                out.isetitem(i, s.astype("category"))
+        elif pd.api.types.infer_dtype(s, skipna=True) in ("string", "empty"):
+            out.isetitem(i, s.astype(target))
+    out.attrs = dict(df.attrs)
+    return out
+
+
+def load_std_df(path: str, progress=None, cancel=None, dtypes: str = None) -> pd.DataFrame:
     """
     读取标准文件：
-      * 第 17 行作为表头（只取前 12 列）
+      * 表头行按列名探测（见 _detect_header，探测不到时用第 17 行），只取前 12 列
       * 只保留 “最终判定 = Y” 的行
       * 生成 '__KEY__'（优先 BC POS NAME / Parts Name）
+    progress / cancel 同 compare；dtypes 见 compact_frame（None = 文本列保持原样）
+    返回表的 attrs['phantom_rows'] 为读取时跳过的空白格式行数（见 _phantom_attrs）
     """
-    raw = pd.read_excel(path, header=None)
-    headers = raw.iloc[HEADER_ROW_STD, :USE_COLS_STD].tolist()
-    df = raw.iloc[HEADER_ROW_STD + 1:, :USE_COLS_STD].copy()
+    tracker = as_tracker(progress, cancel)
+    tracker.report(0, PHASE_READ)
+    header_row = _detect_header(path, STD_HEADER_HINTS, HEADER_ROW_STD, tracker.sub(0, 5))
+    # 从表头行起读：表头上方的标题行不解析
+    raw = read_xlsx(path, header=None, usecols=range(USE_COLS_STD), skiprows=header_row,
+                    tracker=tracker.sub(5, 80))
+    tracker.report(80, PHASE_NORMALIZE)
+    headers = raw.iloc[0, :USE_COLS_STD].tolist()
+    df = raw.iloc[1:, :USE_COLS_STD].copy()
     df.columns = headers
     df = df.dropna(how="all")
 
@@ -80,47 +198,69 @@ def load_std_df(path: str) -> pd.DataFrame:
         df["__KEY__"] = ""
 
     df.reset_index(drop=True, inplace=True)
+    df.attrs = _phantom_attrs(raw)
+    if dtypes:
+        df = compact_frame(df, dtypes)
+    tracker.report(100, PHASE_NORMALIZE)
     return df
 
-def load_sys_df(path: str) -> pd.DataFrame:
+
+def _phantom_attrs(raw: pd.DataFrame) -> dict:
     """
-    读取系统文件（列名优先找，找不到按列号兜底）：
-      H  BC POS
-      I  BC POS NAME
-      K  组立番号(前段)
-      L  组立番号(后段, 不足 2 位补 0)
-      M  是否上传
-      N  品番
+    已用区域超出实际数据的空行 / 空列（格式刷到了几万行之外的导出文件很常见）。
+    read_xlsx 读到最后一个有值的行 / 列为止，这些行不会先建成空行再被 dropna 删掉，这里只把数量带给界面
     """
-    df_raw = pd.read_excel(path, header=0)
+    return {k: int(raw.attrs.get(k, 0)) for k in ("phantom_rows", "phantom_cols")}
+
+# 系统文件用到的列：(候选列名, 找不到时按列号兜底)，依次为 H / I / K / L / M / N
+_SYS_SOURCES = (
+    (["BC POS"], 7),
+    (["BC POS NAME", "BC POS Name"], 8),
+    (["组立番号K", "组立番号(K)"], 10),
+    (["组立番号L", "组立番号(L)"], 11),
+    (["是否上传", "上传"], 12),
+    (["品番", "产品号", "Product Number"], 13),
+)
 
+
+def _sys_usecols(names: list) -> list:
+    """按表头决定系统文件要解码的列号（与 _shape_sys_frame 的查找规则一致）"""
+    cols = []
+    for candidates, default_idx in _SYS_SOURCES:
+        found = next((c for c in candidates if c in names), None)
+        cols.append(names.index(found) if found is not None else default_idx)
+    return cols
+
+
+def _shape_sys_frame(df_raw: pd.DataFrame, source_columns=None) -> pd.DataFrame:
+    """
+    系统文件原始表 → 统一的 6 列结构（不去重，供整表读取 / 分块读取共用）
+    source_columns: 只读了部分列时各列在原表中的列号，兜底列号按它换算
+    """
     def find_col(candidates, default_idx=None):
         for c in candidates:
             if c in df_raw.columns:
                 return df_raw[c]
-        if default_idx is not None and default_idx < df_raw.shape[1]:
-            return df_raw.iloc[:, default_idx]
-        return pd.Series([""] * len(df_raw))
-
-    col_bc_pos      = find_col(["BC POS"], 7)
-    col_bc_posname  = find_col(["BC POS NAME", "BC POS Name"], 8)
-    col_k           = find_col(["组立番号K", "组立番号(K)"], 10)
-    col_l           = find_col(["组立番号L", "组立番号(L)"], 11)
-    col_upload      = find_col(["是否上传", "上传"], 12)
-    col_partno      = find_col(["品番", "产品号", "Product Number"], 13)
-
-    def _to_str(series):
-        return series.map(_num2str).fillna("")
+        if default_idx is not None:
+            if source_columns is not None:
+                if default_idx in source_columns:
+                    return df_raw.iloc[:, source_columns.index(default_idx)]
+            elif default_idx < df_raw.shape[1]:
+                return df_raw.iloc[:, default_idx]
+        return pd.Series([""] * len(df_raw), index=df_raw.index)
+
+    col_bc_pos, col_bc_posname, col_k, col_l, col_upload, col_partno = (
+        find_col(candidates, default_idx) for candidates, default_idx in _SYS_SOURCES)
 
-    col_k = _to_str(col_k)
-    col_l = _to_str(col_l).str.zfill(2)
+    col_k = _text_column(col_k)
+    col_l = _text_column(col_l).str.zfill(2)
 
     df_use = pd.DataFrame({
-        "BC POS":      _to_str(col_bc_pos),
-        "BC POS NAME": _to_str(col_bc_posname),
+        "BC POS":      _text_column(col_bc_pos),
+        "BC POS NAME": _text_column(col_bc_posname),
         "组立番号":     (col_k + " " + col_l).str.strip(),
-        "是否上传":     _to_str(col_upload),
-        "品番":        _to_str(col_partno),
+        "是否上传":     _text_column(col_upload),
+        "品番":        _text_column(col_partno),
     })
 
     df_use["__KEY__"] = df_use["BC POS NAME"].astype(str)
@@ -128,7 +268,122 @@ def load_sys_df(path: str) -> pd.DataFrame:
     # 删除落入数据区的“伪表头”行（例如第一行再次出现列名）
     df_use = _drop_header_like_rows(df_use)
 
-    # 清理空白行、去重并重建索引
-    df_use = df_use.dropna(how="all")
+    # 清理空白行
+    return df_use.dropna(how="all")
+
+
+def load_sys_df(path: str, progress=None, cancel=None, dtypes: str = None) -> pd.DataFrame:
+    """
+    读取系统文件（列名优先找，找不到按列号兜底）：
+      H  BC POS
+      I  BC POS NAME
+      K  组立番号(前段)
+      L  组立番号(后段, 不足 2 位补 0)
+      M  是否上传
+      N  品番
+    progress / cancel / dtypes 同 load_std_df
+    """
+    tracker = as_tracker(progress, cancel)
+    tracker.report(0, PHASE_READ)
+    # 只解码上面这 6 列（按表头决定），其余列只看是否非空
+    df_raw = read_xlsx(path, header=0, usecols=_sys_usecols, tracker=tracker.sub(0, 70))
+    tracker.report(70, PHASE_NORMALIZE)
+    df_use = _shape_sys_frame(df_raw, df_raw.attrs.get("source_columns"))
+    tracker.report(90, PHASE_NORMALIZE)
+
+    # 去重并重建索引
     df_use = df_use.drop_duplicates().reset_index(drop=True)
-    return df_use
\ No newline at end of file
+    df_use.attrs = _phantom_attrs(df_raw)
+    if dtypes:
+        df_use = compact_frame(df_use, dtypes)
+    tracker.report(100, PHASE_NORMALIZE)
+    return df_use
+
+
+def iter_sys_chunks(path: str, chunk_rows: int = 50000, progress=None, cancel=None):
+    """
+    流式读取系统文件：openpyxl 只读模式逐行解析，每 chunk_rows 行产出一块，
+    每块已整理成 load_sys_df 的列结构（未做全表去重，行号为文件内的数据行序号）。
+    进度按工作表声明的总行数估算（没有声明时只检查取消）。
+    """
+    from openpyxl import load_workbook
+
+    tracker = as_tracker(progress, cancel)
+    wb = load_workbook(path, read_only=True, data_only=True)
+    try:
+        ws = wb.worksheets[0]
+        total = ws.max_row or 0
+        rows = ws.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        columns = _header_names(header)
+        width = len(columns)
+
+        buf, start = [], 0
+        for n, row in enumerate(rows):
+            if n % 4096 == 0:
+                tracker.report(100 * n / total if total else 0, PHASE_READ)
+            if all(v is None for v in row):
+                continue  # 与 read_excel 一致：跳过整行空白
+            buf.append(tuple(row[:width]) + (None,) * (width - len(row)))
+            if len(buf) >= chunk_rows:
+                yield _shape_sys_frame(pd.DataFrame(buf, columns=columns, index=range(start, start + len(buf))))
+                start += len(buf)
+                buf = []
+        if buf:
+            yield _shape_sys_frame(pd.DataFrame(buf, columns=columns, index=range(start, start + len(buf))))
+    finally:
+        wb.close()
+
+
+# ---------------- 子进程读取 ---------------- #
+_CHILD = {}
+
+
+class _EventToken:
+    """子进程里的取消标记：父进程 set() 跨进程 Event 后，下一个检查点抛 CompareCancelled"""
+
+    def __init__(self, event):
+        self._event = event
+
+    def check(self):
+        if self._event.is_set():
+            raise CompareCancelled()
+
+
+def _init_child(queue, stop):
+    _CHILD.update(queue=queue, stop=stop)
+
+
+def _run_child(load, path, options):
+    queue = _CHILD["queue"]
+    return load(path, progress=lambda percent, phase: queue.put((percent, phase)),
+                cancel=_EventToken(_CHILD["stop"]), **options)
+
+
+def load_in_process(load, path: str, progress=None, cancel=None, **options):
+    """
+    在单独的子进程里运行 load(path, progress, cancel, **options)，返回读到的表。
+    解析 xlsx / 清洗主要是 Python 代码，两个文件放在同一进程的两个线程里会互相抢 GIL；
+    各开一个子进程才能真正同时读。子进程的进度经队列转给 progress，cancel 取消时通知子进程退出
+    """
+    tracker = as_tracker(progress, cancel)
+    ctx = multiprocessing.get_context()
+    queue, stop = ctx.Queue(), ctx.Event()
+    pool = ProcessPoolExecutor(max_workers=1, mp_context=ctx, initializer=_init_child, initargs=(queue, stop))
+    try:
+        future = pool.submit(_run_child, load, path, options)
+        while not future.done():
+            try:
+                percent, phase = queue.get(timeout=0.1)
+            except Empty:
+                tracker.check()
+                continue
+            tracker.report(percent, phase)
+        return future.result()
+    except CompareCancelled:
+        stop.set()
+        raise
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,85 @@
+"""
+进度回报与协作式取消。
+
+UI 线程持有 CancelToken 并在用户点“取消”时 cancel()；工作线程里的 compare / loaders
+在各阶段之间和长循环里调用 Tracker.check()，发现已取消就抛 CompareCancelled 退出。
+进度回调签名：progress(percent: int, phase: str)。
+"""
+import threading
+
+PHASE_READ = "读取"
+PHASE_NORMALIZE = "归一化"
+PHASE_INDEX = "建索引"
+PHASE_MATCH = "匹配"
+PHASE_FINALIZE = "收尾"
+
+
+class CompareCancelled(Exception):
+    """比对 / 读取被用户取消"""
+
+
+class CancelToken:
+    """跨线程取消标记"""
+
+    def __init__(self):
+        self._event = threading.Event()
+
+    def cancel(self):
+        self._event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def check(self):
+        if self._event.is_set():
+            raise CompareCancelled()
+
+
+class Tracker:
+    """
+    把 (进度回调, 取消标记) 打包；report() 先检查取消再回报进度。
+    sub(start, end) 得到一个把 0-100 映射到 [start, end] 的子 Tracker，供嵌套步骤使用。
+    """
+
+    def __init__(self, progress=None, cancel: CancelToken = None, start: float = 0, end: float = 100):
+        self.progress = progress
+        self.cancel = cancel
+        self.start = start
+        self.end = end
+
+    def check(self):
+        if self.cancel is not None:
+            self.cancel.check()
+
+    def report(self, percent: float, phase: str = ""):
+        self.check()
+        if self.progress is not None:
+            self.progress(int(self.start + (self.end - self.start) * percent / 100), phase)
+
+    def sub(self, start: float, end: float) -> "Tracker":
+        span = self.end - self.start
+        return Tracker(self.progress, self.cancel,
+                       self.start + span * start / 100, self.start + span * end / 100)
+
+
+NULL_TRACKER = Tracker()
+
+
+def as_tracker(progress=None, cancel: CancelToken = None) -> Tracker:
+    if isinstance(progress, Tracker):
+        return progress
+    if progress is None and cancel is None:
+        return NULL_TRACKER
+    return Tracker(progress, cancel)
+
+
+CANCELLED = object()
+
+
+def cancellable(fn, *args, **kwargs):
+    """在工作线程里运行 fn；被取消时返回 CANCELLED 而不是把异常当错误抛给界面"""
+    try:
+        return fn(*args, **kwargs)
+    except CompareCancelled:
+        return CANCELLED
@@ -6,29 +6,49 @@ class DataFrameModel(QAbstractTableModel):
     def __init__(self, df: pd.DataFrame | None = None, status_col: str | None = None):
         super().__init__()
         self._df = df if df is not None else pd.DataFrame()
+        self._extra = {}
         self._status_col = status_col
 
-    def setDataFrame(self, df: pd.DataFrame | None):
+    def setDataFrame(self, df: pd.DataFrame | None, extra: dict | None = None):
+        """
+        extra: {列名: 与 df 行号对齐的数组}，显示为 df 右侧的附加列（copy-free 比对结果），
+               不拼接到 df 上
+        """
         self.beginResetModel()
         self._df = df if df is not None else pd.DataFrame()
+        self._extra = dict(extra) if extra else {}
         self.endResetModel()
 
+    def _value(self, row: int, col: int):
+        ncols = len(self._df.columns)
+        if col < ncols:
+            return self._df.iat[row, col]
+        return list(self._extra.values())[col - ncols][row]
+
+    def _status(self, row: int):
+        if self._status_col in self._extra:
+            return self._extra[self._status_col][row]
+        if self._status_col in self._df.columns:
+            return self._df[self._status_col].iat[row]
+        return None
+
     def rowCount(self, parent=QModelIndex()) -> int:
         return 0 if parent.isValid() else len(self._df)
 
     def columnCount(self, parent=QModelIndex()) -> int:
-        return 0 if parent.isValid() else len(self._df.columns)
+        return 0 if parent.isValid() else len(self._df.columns) + len(self._extra)
 
     def data(self, index: QModelIndex, role=Qt.DisplayRole):
         if not index.isValid():
             return None
 
         if role == Qt.DisplayRole:
-            v = self._df.iat[index.row(), index.column()]
-            return "" if pd.isna(v) else str(v)
+            v = self._value(index.row(), index.column())
+            # list 单元格（流式比对结果里的品番 / 组立候选列）与导出一样显示成文本
+            return str(v) if isinstance(v, (list, tuple)) else ("" if pd.isna(v) else str(v))
 
-        if role == Qt.BackgroundRole and self._status_col and self._status_col in self._df.columns:
-            status = self._df.iloc[index.row()][self._status_col]
+        if role == Qt.BackgroundRole and self._status_col:
+            status = self._status(index.row())
             if status == "OK":
                 return QColor("#E8F5E9")
             elif status == "NG":
@@ -43,6 +63,9 @@ class DataFrameModel(QAbstractTableModel):
             return None
         if orientation == Qt.Horizontal:
             try:
+                ncols = len(self._df.columns)
+                if section >= ncols:
+                    return str(list(self._extra)[section - ncols])
                 return str(self._df.columns[section])
             except Exception:
                 return ""
@@ -50,4 +73,4 @@ class DataFrameModel(QAbstractTableModel):
             try:
                 return str(self._df.index[section])
             except Exception:
-                return ""
\ No newline at end of file
+                return ""
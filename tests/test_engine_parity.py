@@ -0,0 +1,55 @@
+"""各比对引擎的结果必须逐行一致（legacy 为基准）"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from benchmarks.synthetic import STD_COLUMNS, synthetic_frames
+from checker_ui.core import comparator
+
+
+def _std_row(name, pn, assy):
+    row = dict.fromkeys(STD_COLUMNS, '')
+    row.update({'最终判定': 'Y', 'Parts Name': name, '品番': pn, '组立番号': assy})
+    return row
+
+
+def _frames_with_fullwidth_assy():
+    """组立番号用全角数字：归一化后与半角不是同一个字符串，逐字比较的 legacy 判 NG"""
+    std_df = pd.DataFrame([
+        _std_row('HV ECU', '12345', '１２３４ ５６７８'),
+        _std_row('HV ECU', '12345', '1234 5678'),
+        _std_row('EPS ECU', '23456', '２３４５ ６７８９/8765 4321'),
+    ], columns=STD_COLUMNS)
+    std_df['__KEY__'] = std_df['Parts Name']
+    sys_df = pd.DataFrame({
+        'BC POS': ['U01', 'U02', 'U03'],
+        'BC POS NAME': ['HV ECU', 'EPS ECU', 'EPS ECU'],
+        '组立番号': ['123456 78', '234567 89', '２３４５６７ ８９'],
+        '是否上传': ['1', '1', '1'],
+        '品番': ['12345-0E010', '23456-0E020', '23456-0E030'],
+    })
+    sys_df['__KEY__'] = sys_df['BC POS NAME']
+    return std_df, sys_df
+
+
+def _codes(result):
+    return [np.asarray(getattr(result, f)) for f in ('std_status', 'sys_status')]
+
+
+@pytest.mark.parametrize('engine', [e for e in comparator.ENGINES if e != 'legacy'])
+def test_fullwidth_assy_digits_match_legacy(engine):
+    std_df, sys_df = _frames_with_fullwidth_assy()
+    reference = comparator.compare_results(std_df, sys_df, engine='legacy')
+    result = comparator.compare_results(std_df, sys_df, engine=engine)
+    assert list(comparator.status_labels(reference.std_status)) == ['NG', 'OK', 'OK']
+    for got, expected in zip(_codes(result), _codes(reference)):
+        np.testing.assert_array_equal(got, expected)
+
+
+@pytest.mark.parametrize('engine', [e for e in comparator.ENGINES if e != 'legacy'])
+def test_synthetic_frames_match_legacy(engine):
+    std_df, sys_df = synthetic_frames(2000, seed=1)
+    reference = comparator.compare_results(std_df, sys_df, engine='legacy')
+    result = comparator.compare_results(std_df, sys_df, engine=engine)
+    for got, expected in zip(_codes(result), _codes(reference)):
+        np.testing.assert_array_equal(got, expected)
@@ -0,0 +1,56 @@
+"""增量比对拼接出的结果必须与整表 compare_results 逐行一致"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from benchmarks.synthetic import synthetic_frames
+from checker_ui.core import comparator, incremental
+
+_FIELDS = ('std_status', 'std_reason', 'sys_status', 'sys_reason', 'std_orphan', 'sys_orphan', 'std_near', 'std_diff')
+
+
+def _assert_same(got, expected):
+    for f in _FIELDS:
+        np.testing.assert_array_equal(getattr(got, f), getattr(expected, f), err_msg=f)
+    assert got.orphan_std_keys == expected.orphan_std_keys
+    for a, b in zip(got.links.pairs(), expected.links.pairs()):
+        np.testing.assert_array_equal(a, b)
+
+
+def _edit(std_df, sys_df):
+    """在几个 key 组里改 / 增 / 删行（两侧都有），并让一个 key 在系统端整组消失、一个新 key 出现"""
+    sys_keys = sys_df['BC POS NAME'].str.strip().str.lower()
+    groups = sys_keys.drop_duplicates().tolist()
+    sys_df = sys_df.copy()
+    rows = np.flatnonzero(sys_keys == groups[0])
+    sys_df.loc[rows[0], '品番'] = '00000-0E000'                         # 改品番
+    sys_df.loc[rows[-1], '是否上传'] = '0' if sys_df.loc[rows[-1], '是否上传'] == '1' else '1'
+    sys_df.loc[np.flatnonzero(sys_keys == groups[1])[0], '组立番号'] = '111111 11'   # 改组立
+    added = sys_df.iloc[np.flatnonzero(sys_keys == groups[2])[:1]].assign(品番='22222-0E222')
+    new_key = sys_df.iloc[:1].assign(**{'BC POS NAME': 'NEW ECU 99999', '__KEY__': 'NEW ECU 99999'})
+    dropped = (sys_keys == groups[3]) | sys_df.index.isin(np.flatnonzero(sys_keys == groups[4])[:2])
+    sys_df = pd.concat([sys_df[~dropped], added, new_key], ignore_index=True)     # 删行后行号整体前移
+
+    std_df = std_df.copy()
+    std_df.loc[0, '组立番号'] = '9999 99 99'
+    std_df = pd.concat([std_df.drop(index=[1, 2]), std_df.iloc[[5]].assign(品番='ALL')], ignore_index=True)
+    return std_df, sys_df
+
+
+@pytest.mark.parametrize('engine', ['vectorized', 'indexed'])
+def test_splice_matches_full_compare(engine):
+    std_df, sys_df = synthetic_frames(3000, seed=2)
+    memo = incremental.CompareMemo()
+    _assert_same(incremental.compare_incremental(std_df, sys_df, memo, engine=engine),
+                 comparator.compare_results(std_df, sys_df, engine=engine))
+    assert memo.recomputed_keys == memo.total_keys
+
+    std2, sys2 = _edit(std_df, sys_df)
+    got = incremental.compare_incremental(std2, sys2, memo, engine=engine)
+    _assert_same(got, comparator.compare_results(std2, sys2, engine=engine))
+    assert 0 < memo.recomputed_keys < memo.total_keys // 4        # 确实只重算了改动的组
+
+    # 没有变化：全部沿用，结果不变
+    again = incremental.compare_incremental(std2, sys2, memo, engine=engine)
+    assert memo.recomputed_keys == 0
+    _assert_same(again, got)
@@ -0,0 +1,113 @@
+"""read_xlsx 的结果必须与 pd.read_excel 一致（日期格式的数字单元格除外：不读样式，保持为数字）"""
+from datetime import datetime
+
+import pandas as pd
+import pytest
+import xlsxwriter
+
+from checker_ui.core.xlsxreader import read_xlsx
+
+# 稀疏：第 3、6 行整行空，E 列只有一个值，末尾 G 列只在第 8 行有值
+_ROWS = {
+    0: ['BC POS', 'BC POS NAME', '品番', '数量', None, '备注'],
+    1: ['U01', 'HV ECU', '12345-0E010', 1, None, 'a'],
+    3: ['U02', 'EPS ECU', 23456, 2.5, None, None],
+    4: ['U03', None, '34567', 3, 'only', True],
+    6: ['U04', 'ECU "A"', '45678', None, None, 'x_y'],
+    7: [None, None, None, 4, None, None, 'tail'],
+}
+
+
+def _write(path, inline=False, rich=False):
+    """inline=True 时单元格用内联字符串（constant_memory），否则用共享字符串表"""
+    wb = xlsxwriter.Workbook(str(path), {'constant_memory': inline})
+    ws = wb.add_worksheet()
+    for r in sorted(_ROWS):
+        for c, v in enumerate(_ROWS[r]):
+            if v is not None:
+                ws.write(r, c, v)
+    if rich:
+        ws.write_rich_string(8, 1, 'HV ', wb.add_format({'bold': True}), 'ECU')
+    wb.close()
+    return path
+
+
+def _expected(path, header=None, usecols=None, nrows=None, skiprows=0):
+    df = pd.read_excel(path, header=header, nrows=nrows, skiprows=skiprows)
+    if usecols is None:
+        return df
+    return df.iloc[:, [c for c in usecols if c < df.shape[1]]]
+
+
+@pytest.mark.parametrize('inline', [False, True], ids=['shared', 'inline'])
+@pytest.mark.parametrize('header', [None, 0])
+@pytest.mark.parametrize('usecols', [None, [0, 2, 4, 6, 9]])
+@pytest.mark.parametrize('nrows', [None, 3])
+@pytest.mark.parametrize('skiprows', [0, 2])
+def test_matches_read_excel(tmp_path, inline, header, usecols, nrows, skiprows):
+    path = _write(tmp_path / 'sheet.xlsx', inline=inline)
+    got = read_xlsx(path, header=header, usecols=usecols, nrows=nrows, skiprows=skiprows)
+    pd.testing.assert_frame_equal(got, _expected(path, header, usecols, nrows, skiprows))
+
+
+def test_shared_string_runs_are_joined(tmp_path):
+    path = _write(tmp_path / 'rich.xlsx', rich=True)
+    got = read_xlsx(path, header=0)
+    pd.testing.assert_frame_equal(got, pd.read_excel(path, header=0))
+    assert got.iloc[-1]['BC POS NAME'] == 'HV ECU'
+
+
+def test_callable_usecols_sees_header_names(tmp_path):
+    path = _write(tmp_path / 'sheet.xlsx')
+    seen = []
+
+    def pick(names):
+        seen.append(names)
+        return [i for i, n in enumerate(names) if n in ('BC POS NAME', '数量')]
+
+    got = read_xlsx(path, header=0, usecols=pick)
+    # 读到表头行时就决定：看到的是表头行本身宽度内的列名
+    assert seen == [list(pd.read_excel(path, header=0).columns[:len(_ROWS[0])])]
+    pd.testing.assert_frame_equal(got, pd.read_excel(path, header=0)[['BC POS NAME', '数量']])
+    assert got.attrs['source_columns'] == [1, 3]
+
+
+def test_date_styled_cells_stay_serial_numbers(tmp_path):
+    path = tmp_path / 'dates.xlsx'
+    wb = xlsxwriter.Workbook(str(path))
+    ws = wb.add_worksheet()
+    ws.write_row(0, 0, ['BC POS', '日期'])
+    ws.write(1, 0, 'U01')
+    ws.write_datetime(1, 1, datetime(2025, 7, 14), wb.add_format({'num_format': 'yyyy-mm-dd'}))
+    wb.close()
+    got = read_xlsx(path, header=0)
+    expected = pd.read_excel(path, header=0)
+    assert expected.loc[0, '日期'] == pd.Timestamp(2025, 7, 14)
+    assert got.loc[0, '日期'] == (datetime(2025, 7, 14) - datetime(1899, 12, 30)).days
+    pd.testing.assert_frame_equal(got[['BC POS']], expected[['BC POS']])
+
+
+def test_phantom_rows_and_cols_are_skipped(tmp_path):
+    """只带格式的空单元格 / 空行把已用区域撑到 Z200：结果与 read_excel 相同，多出的部分记在 attrs"""
+    path = tmp_path / 'phantom.xlsx'
+    wb = xlsxwriter.Workbook(str(path))
+    ws = wb.add_worksheet()
+    fmt = wb.add_format({'bg_color': '#FFFF00'})
+    for r in sorted(_ROWS):
+        for c, v in enumerate(_ROWS[r]):
+            if v is not None:
+                ws.write(r, c, v)
+    for r in range(20, 200):
+        ws.write_blank(r, 25, None, fmt)
+    ws.set_row(150, None, fmt)
+    wb.close()
+
+    got = read_xlsx(path, header=0)
+    pd.testing.assert_frame_equal(got, pd.read_excel(path, header=0))
+    assert got.attrs['phantom_rows'] == 200 - 8
+    assert got.attrs['phantom_cols'] == 26 - 7
+    assert got.attrs['source_columns'] == list(range(7))
+
+    bounded = read_xlsx(path, header=None, usecols=range(3), skiprows=2)
+    assert bounded.attrs['phantom_cols'] == 26 - 7
+    pd.testing.assert_frame_equal(bounded, pd.read_excel(path, header=None, skiprows=2).iloc[:, :3])
@@ -1,16 +1,23 @@
+import os
+import shutil
+from functools import partial
+
 from PySide6.QtWidgets import (
     QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, QTableView,
     QFileDialog, QPushButton, QLabel, QStatusBar, QMessageBox,
-    QSplitter, QToolBar, QHeaderView, QSizePolicy
+    QSplitter, QToolBar, QHeaderView, QSizePolicy, QSpinBox, QProgressBar, QDialog,
+    QAbstractItemView
 )
 from PySide6.QtGui import QAction
-from PySide6.QtCore import Qt, QThreadPool, QTimer
+from PySide6.QtCore import Qt, QThreadPool, QTimer, QItemSelection, QItemSelectionModel
 
 from models.state import AppState
 from models.dataframe_model import DataFrameModel
 from infra.threads import Worker
 
 from core import loaders as loaders, comparator as comparator, exporter as exporter
+from core import incremental as incremental, streaming as streaming, batch as batch
+from core import cache as cache, progress as progress, rules as rules
 
 
 class MainWindow(QMainWindow):
@@ -21,6 +28,11 @@ class MainWindow(QMainWindow):
 
         self.state = AppState()
         self.thread_pool = QThreadPool.globalInstance()
+        self.result_cache = cache.ResultCache()
+        self.frame_cache = cache.FrameCache()
+        self._cancel_tokens = set()  # 正在运行、可取消的后台任务
+        # 运行中的 Worker：线程池跑完就释放 QRunnable，不留引用的话 signals 可能在排队的 result 送达前被回收
+        self._workers = set()
 
         self._build_ui()
         self._connect_signals()
@@ -28,6 +40,13 @@ class MainWindow(QMainWindow):
         # 仅做一次自动列宽的标记，避免频繁触发
         self._sized_std_once = False
         self._sized_sys_once = False
+        # “同时打开两个文件”：还没读完的一侧 / 各侧进度 (百分比, 阶段)
+        self._pair_pending = set()
+        self._pair_progress = {}
+        # 上一次比对结果是否直接取自结果缓存（状态栏据此显示）
+        self._compare_cached = False
+        # 有比对在跑时读完的文件对：等当前比对结束（_after_compare）再自动比对
+        self._compare_queued = False
 
     # ---------------------- UI ---------------------- #
     def _build_ui(self):
@@ -43,19 +62,54 @@ class MainWindow(QMainWindow):
         # 基本动作
         self.act_open_std = QAction("打开标准文件", self)
         self.act_open_sys = QAction("打开系统文件", self)
+        self.act_open_pair = QAction("同时打开两个文件", self)
+        self.act_open_pair.setToolTip("依次选择标准文件和系统文件，两个子进程并行读取，都读完后自动比对")
         self.act_compare = QAction("一致性校对", self)
+        self.act_compare_stream = QAction("流式比对（大文件）", self)
+        self.act_compare_batch = QAction("批量比对（多标准）", self)
         self.act_export = QAction("导出Excel", self)
         # 新增：自适应列宽（一次）
         self.act_fit_cols = QAction("自适应列宽（一次）", self)
+        self.act_clear_cache = QAction("清除缓存", self)
+        self.act_load_rules = QAction("加载匹配规则", self)
+        self.act_load_rules.setToolTip("按产线切换品番 / 组立位数、分隔符、通配、列名等规则（JSON / YAML）")
+        # 近似 key 建议：标准 key 在系统端不存在时，找最像的系统 key（错字 / 空格差异）
+        self.act_suggest = QAction("近似 key 建议", self)
+        self.act_suggest.setCheckable(True)
+        self.act_suggest.setToolTip("比对时为孤立标准 key 查找近似的系统 key")
+        self.act_show_suggest = QAction("查看 key 建议", self)
+        # 紧凑内存：读取时把重复多的文本列转成 Categorical（两张大表同时打开时内存明显下降）
+        self.act_compact = QAction("紧凑内存", self)
+        self.act_compact.setCheckable(True)
+        self.act_compact.setToolTip("读取时把 是否上传 / BC POS / 组立番号 等重复多的列存为分类类型；对之后打开的文件生效")
+        self.act_cancel = QAction("取消", self)
+        self.act_cancel.setShortcut("Esc")
+        self.act_cancel.setEnabled(False)
 
         tb.addAction(self.act_open_std)
         tb.addAction(self.act_open_sys)
+        tb.addAction(self.act_open_pair)
         tb.addSeparator()
         tb.addAction(self.act_compare)
+        tb.addAction(self.act_compare_stream)
+        tb.addAction(self.act_compare_batch)
+        tb.addAction(self.act_load_rules)
+        tb.addAction(self.act_cancel)
+        # 并行进程数（1 = 串行；大文件可调高）
+        tb.addWidget(QLabel(" 并行进程: "))
+        self.spin_workers = QSpinBox(self)
+        self.spin_workers.setRange(1, max(1, os.cpu_count() or 1))
+        self.spin_workers.setValue(1)
+        self.spin_workers.setToolTip("按 key 分区后多进程比对，结果与串行一致")
+        tb.addWidget(self.spin_workers)
+        tb.addAction(self.act_suggest)
+        tb.addAction(self.act_show_suggest)
         tb.addSeparator()
         tb.addAction(self.act_export)
         tb.addSeparator()
         tb.addAction(self.act_fit_cols)
+        tb.addAction(self.act_compact)
+        tb.addAction(self.act_clear_cache)
 
         # 中央区域
         central = QWidget()
@@ -76,11 +130,16 @@ class MainWindow(QMainWindow):
         self.lbl_std_ng = self._make_chip("标准 NG: 0", "#FFEBEE")
         self.lbl_sys_ok = self._make_chip("系统 OK: 0", "#E8F5E9")
         self.lbl_sys_ng = self._make_chip("系统 NG: 0", "#FFEBEE")
+        # 孤立：系统行的 key 标准里没有 / 标准 key 系统里没有
+        self.lbl_sys_orphan = self._make_chip("系统孤立行: 0", "#FFF8E1")
+        self.lbl_std_orphan = self._make_chip("标准孤立 key: 0", "#FFF8E1")
 
         summary_layout.addWidget(self.lbl_std_ok)
         summary_layout.addWidget(self.lbl_std_ng)
         summary_layout.addWidget(self.lbl_sys_ok)
         summary_layout.addWidget(self.lbl_sys_ng)
+        summary_layout.addWidget(self.lbl_sys_orphan)
+        summary_layout.addWidget(self.lbl_std_orphan)
         summary_layout.addStretch()
         layout.addWidget(summary_bar)
 
@@ -116,17 +175,25 @@ class MainWindow(QMainWindow):
         # 底部状态栏
         self.status = QStatusBar()
         self.setStatusBar(self.status)
+        self.progress_bar = QProgressBar()
+        self.progress_bar.setRange(0, 100)
+        self.progress_bar.setMaximumWidth(260)
+        self.progress_bar.setVisible(False)
+        self.status.addPermanentWidget(self.progress_bar)
 
     def _make_chip(self, text: str, bg: str) -> QLabel:
         lbl = QLabel(text)
         lbl.setStyleSheet(f"padding:2px 8px; border-radius:4px; background:{bg};")
         return lbl
 
-    def _update_summary_chips(self, ok_std: int, ng_std: int, ok_sys: int, ng_sys: int):
+    def _update_summary_chips(self, ok_std: int, ng_std: int, ok_sys: int, ng_sys: int,
+                              orphan_sys: int = 0, orphan_std_keys: int = 0):
         self.lbl_std_ok.setText(f"标准 OK: {ok_std}")
         self.lbl_std_ng.setText(f"标准 NG: {ng_std}")
         self.lbl_sys_ok.setText(f"系统 OK: {ok_sys}")
         self.lbl_sys_ng.setText(f"系统 NG: {ng_sys}")
+        self.lbl_sys_orphan.setText(f"系统孤立行: {orphan_sys}")
+        self.lbl_std_orphan.setText(f"标准孤立 key: {orphan_std_keys}")
 
     # —— 快速列宽：只扫描前若干行/列，限制最大宽 —— #
     def _autosize_columns_fast(self, view: QTableView, max_rows: int = 200,
@@ -159,117 +226,256 @@ class MainWindow(QMainWindow):
 
     # —— 比对返回校验 & 完成后恢复 —— #
     def _validate_compare_result(self, result):
-        """校验 compare() 返回值，确保为 (std_df, sys_df) 且包含'比对结果'列"""
-        try:
-            std_df, sys_df = result
-        except Exception as e:
-            raise ValueError(f"compare() 应返回2个DataFrame，实际得到：{type(result)}") from e
-        for name, df in (("标准", std_df), ("系统", sys_df)):
-            if not hasattr(df, "columns"):
-                raise TypeError(f"{name}结果不是 DataFrame：{type(df)}")
-            if "比对结果" not in df.columns:
-                raise KeyError(f"{name}结果缺少 '比对结果' 列")
-        return std_df, sys_df
+        """校验比对返回值：CompareResult，且行数与当前标准 / 系统表一致"""
+        if not isinstance(result, comparator.CompareResult):
+            raise TypeError(f"比对应返回 CompareResult，实际得到：{type(result)}")
+        for name, status, df in (("标准", result.std_status, self.state.std_df),
+                                 ("系统", result.sys_status, self.state.sys_df)):
+            if len(status) != len(df):
+                raise ValueError(f"{name}结果行数 {len(status)} 与表格行数 {len(df)} 不一致")
+        return result
 
     def _after_compare(self):
         self.act_compare.setEnabled(True)
+        self.act_compare_stream.setEnabled(True)
+        self.act_compare_batch.setEnabled(True)
         try:
             self.unsetCursor()
         except Exception:
             pass
+        if self._compare_queued:
+            # “同时打开两个文件”读完时正有比对在跑：等它结束再比
+            self._compare_queued = False
+            QTimer.singleShot(0, self.do_compare)
+
+    # —— 可取消的后台任务：进度条 + 取消 —— #
+    def _start_task(self, on_result, fn, *args, on_progress=None, **kwargs):
+        """
+        在线程池里运行 fn(*args, progress=..., cancel=..., **kwargs)；
+        进度显示在状态栏进度条上（on_progress 给出时改由它处理），“取消”按钮 / Esc 会让 fn 在下一个检查点退出。
+        """
+        token = progress.CancelToken()
+        worker = Worker(progress.cancellable, fn, *args, **kwargs)
+        worker.kwargs.update(progress=worker.signals.progress.emit, cancel=token)
+        worker.signals.progress.connect(on_progress or self._on_progress)
+        worker.signals.result.connect(lambda res: self._on_task_result(res, on_result))
+        worker.signals.error.connect(self._on_error)
+        worker.signals.finished.connect(lambda: self._on_task_finished(token, worker))
+
+        self._cancel_tokens.add(token)
+        self._workers.add(worker)
+        self.act_cancel.setEnabled(True)
+        self.progress_bar.setValue(0)
+        self.progress_bar.setFormat("%p%")
+        self.progress_bar.setVisible(True)
+        self.thread_pool.start(worker)
+        return worker
+
+    def _on_progress(self, percent: int, phase: str):
+        self.progress_bar.setValue(percent)
+        self.progress_bar.setFormat(f"{phase} %p%" if phase else "%p%")
+
+    def _on_task_result(self, result, on_result):
+        if result is progress.CANCELLED:
+            self.status.showMessage("已取消", 5000)
+            return
+        on_result(result)
+
+    def _on_task_finished(self, token, worker=None):
+        self._cancel_tokens.discard(token)
+        self._workers.discard(worker)
+        if not self._cancel_tokens:
+            self.act_cancel.setEnabled(False)
+            self.progress_bar.setVisible(False)
+
+    def cancel_tasks(self):
+        for token in self._cancel_tokens:
+            token.cancel()
+        self.status.showMessage("正在取消...", 3000)
 
     # ---------------------- 信号连接 ---------------------- #
     def _connect_signals(self):
         # 工具栏
         self.act_open_std.triggered.connect(self.load_std)
         self.act_open_sys.triggered.connect(self.load_sys)
+        self.act_open_pair.triggered.connect(self.load_pair)
         self.act_compare.triggered.connect(self.do_compare)
+        self.act_compare_stream.triggered.connect(self.do_compare_stream)
+        self.act_compare_batch.triggered.connect(self.do_compare_batch)
         self.act_export.triggered.connect(self.export_excel)
         self.act_back.triggered.connect(self.go_home)
         self.act_fit_cols.triggered.connect(
             lambda: (self._autosize_columns_fast(self.table_std),
                      self._autosize_columns_fast(self.table_sys))
         )
+        self.act_clear_cache.triggered.connect(self.clear_result_cache)
+        self.act_cancel.triggered.connect(self.cancel_tasks)
+        self.act_show_suggest.triggered.connect(self.show_key_suggestions)
+        self.act_load_rules.triggered.connect(self.load_rules)
+        # 联动选择：点一侧的行，高亮另一侧与之匹配的行
+        self.table_std.selectionModel().currentRowChanged.connect(self._on_std_row_changed)
+        self.table_sys.selectionModel().currentRowChanged.connect(self._on_sys_row_changed)
 
     # 便于“入口页 -> 传入路径”复用
     def load_std_path(self, path: str):
         if not path:
             return
-        worker = Worker(loaders.load_std_df, path)
-        worker.signals.result.connect(self._on_std_loaded)
-        worker.signals.error.connect(self._on_error)
-        self.thread_pool.start(worker)
+        self._start_task(lambda res, p=path: self._on_std_loaded(res[0], p, res[1]),
+                         self._load_frame, loaders.load_std_df, path, **self._load_options())
         self.status.showMessage("正在读取标准文件...", 3000)
 
     def load_sys_path(self, path: str):
         if not path:
             return
-        worker = Worker(loaders.load_sys_df, path)
-        worker.signals.result.connect(self._on_sys_loaded)
-        worker.signals.error.connect(self._on_error)
-        self.thread_pool.start(worker)
+        self._start_task(lambda res, p=path: self._on_sys_loaded(res[0], p, res[1]),
+                         self._load_frame, loaders.load_sys_df, path, **self._load_options())
         self.status.showMessage("正在读取系统文件...", 3000)
 
+    def load_pair_paths(self, std_path: str, sys_path: str):
+        """
+        两个文件同时读：各自一个后台任务，未命中读表缓存时在子进程里解析（多核时）；
+        进度条上分别显示两边的进度，哪边先读完先显示，两边都读完自动开始比对
+        """
+        if not std_path or not sys_path:
+            return
+        run = {"run": loaders.load_in_process} if (os.cpu_count() or 1) > 1 else {}
+        self._pair_pending = {"标准", "系统"}
+        self._pair_progress = {}
+        for side, path, load, on_loaded in (("标准", std_path, loaders.load_std_df, self._on_std_loaded),
+                                            ("系统", sys_path, loaders.load_sys_df, self._on_sys_loaded)):
+            self._start_task(lambda res, s=side, p=path, done=on_loaded: self._on_pair_loaded(s, done, res, p),
+                             self._load_frame, load, path,
+                             on_progress=lambda percent, phase, s=side: self._on_pair_progress(s, percent, phase),
+                             **run, **self._load_options())
+        self.status.showMessage("正在同时读取标准文件和系统文件...", 3000)
+
+    def _on_pair_progress(self, side: str, percent: int, phase: str):
+        self._pair_progress[side] = (percent, phase)
+        sides = ("标准", "系统")
+        self.progress_bar.setValue(sum(self._pair_progress.get(s, (0, ""))[0] for s in sides) // len(sides))
+        self.progress_bar.setFormat(" · ".join(
+            f"{s} {self._pair_progress[s][1]} {self._pair_progress[s][0]}%" if s in self._pair_progress else f"{s} 等待"
+            for s in sides))
+
+    def _on_pair_loaded(self, side: str, on_loaded, result, path: str):
+        df, digest = result
+        on_loaded(df, path, digest)
+        self._pair_pending.discard(side)
+        if self._pair_pending:
+            return
+        # 比对进行中时“一致性校对”是禁用的（共用的 CompareMemo 不能同时被两次比对改写）：排队等它结束
+        if self.act_compare.isEnabled():
+            self.do_compare()
+        else:
+            self._compare_queued = True
+            self.status.showMessage("两个文件已读完，当前比对结束后自动开始比对", 5000)
+
+    def _load_frame(self, load, path: str, progress=None, cancel=None, **options):
+        """
+        工作线程里执行：读表（走读表缓存）→ (df, 读取时的文件内容哈希)。
+        比对结果缓存按这个哈希取键：读完之后文件又被覆盖，结果也不会存到新内容的键下
+        """
+        try:
+            digest = self.frame_cache.digest(path)
+        except OSError:
+            digest = None
+        return cache.cached_load(self.frame_cache, load, path, progress, cancel, **options), digest
+
+    def _load_options(self) -> dict:
+        return {"dtypes": "category"} if self.act_compact.isChecked() else {}
+
     # ---------------------- 动作 ---------------------- #
     def load_std(self):
         path, _ = QFileDialog.getOpenFileName(self, "选择标准文件", "", "Excel (*.xlsx *.xls)")
-        if not path:
-            return
-        worker = Worker(loaders.load_std_df, path)
-        worker.signals.result.connect(self._on_std_loaded)
-        worker.signals.error.connect(self._on_error)
-        self.thread_pool.start(worker)
-        self.status.showMessage("正在读取标准文件...", 3000)
+        self.load_std_path(path)
 
-    def _on_std_loaded(self, df):
+    def _on_std_loaded(self, df, path: str = "", digest: str = None):
         self.state.std_df = df
+        self.state.compare_result = None
+        self.state.meta["std_path"] = path
+        self.state.meta["std_digest"] = digest
+        self.state.meta.pop("stream_out", None)
         self.model_std.setDataFrame(df)
         # 只做一次轻量自适应（避免每次都扫全表）
         if not self._sized_std_once:
             QTimer.singleShot(0, lambda: self._autosize_columns_fast(self.table_std))
             self._sized_std_once = True
-        self.status.showMessage("标准文件读取完成", 5000)
+        self.status.showMessage("标准文件读取完成" + self._phantom_note(df), 5000)
+
+    @staticmethod
+    def _phantom_note(df) -> str:
+        skipped = getattr(df, "attrs", {}).get("phantom_rows", 0)
+        return f"（已跳过 {skipped} 行空白格式行）" if skipped else ""
 
     def load_sys(self):
         path, _ = QFileDialog.getOpenFileName(self, "选择系统文件", "", "Excel (*.xlsx *.xls)")
-        if not path:
+        self.load_sys_path(path)
+
+    def load_pair(self):
+        std_path, _ = QFileDialog.getOpenFileName(self, "选择标准文件", "", "Excel (*.xlsx *.xls)")
+        if not std_path:
             return
-        worker = Worker(loaders.load_sys_df, path)
-        worker.signals.result.connect(self._on_sys_loaded)
-        worker.signals.error.connect(self._on_error)
-        self.thread_pool.start(worker)
-        self.status.showMessage("正在读取系统文件...", 3000)
+        sys_path, _ = QFileDialog.getOpenFileName(self, "选择系统文件", "", "Excel (*.xlsx *.xls)")
+        self.load_pair_paths(std_path, sys_path)
 
-    def _on_sys_loaded(self, df):
+    def _on_sys_loaded(self, df, path: str = "", digest: str = None):
         self.state.sys_df = df
+        self.state.compare_result = None
+        self.state.meta["sys_path"] = path
+        self.state.meta["sys_digest"] = digest
         self.model_sys.setDataFrame(df)
         if not self._sized_sys_once:
             QTimer.singleShot(0, lambda: self._autosize_columns_fast(self.table_sys))
             self._sized_sys_once = True
-        self.status.showMessage("系统文件读取完成", 5000)
+        self.status.showMessage("系统文件读取完成" + self._phantom_note(df), 5000)
 
     def do_compare(self):
         if self.state.std_df is None or self.state.sys_df is None:
             QMessageBox.warning(self, "提示", "请先加载标准文件和系统文件")
             return
-        # 防重复点击 & 忙碌指示
+        # 防重复点击 & 忙碌指示（比对进行中也不能开始流式 / 批量比对）
         self.act_compare.setEnabled(False)
+        self.act_compare_stream.setEnabled(False)
+        self.act_compare_batch.setEnabled(False)
         try:
             self.setCursor(Qt.BusyCursor)
         except Exception:
             pass
 
-        worker = Worker(comparator.compare, self.state.std_df, self.state.sys_df)
-        worker.signals.result.connect(self._on_compared)
-        worker.signals.error.connect(self._on_error)
+        # 增量比对：只重算与上次相比发生变化的 key 组
+        if self.state.compare_memo is None:
+            self.state.compare_memo = incremental.CompareMemo()
+        std_digest = self.state.meta.get("std_digest")
+        sys_digest = self.state.meta.get("sys_digest")
+        worker = self._start_task(self._on_compared, self._run_compare, std_digest, sys_digest,
+                                  workers=self.spin_workers.value(), suggest=self.act_suggest.isChecked())
         worker.signals.finished.connect(self._after_compare)
-        self.thread_pool.start(worker)
         self.status.showMessage("正在比对...", 3000)
 
+    def _run_compare(self, std_digest, sys_digest, workers=1, suggest=False, progress=None, cancel=None):
+        """
+        工作线程里执行：copy-free 增量比对（读取的表不复制、不改动，只返回结果数组）；
+        同一对文件已比对过（读表时的内容哈希一致）⇒ 直接取缓存结果
+        """
+        profile = self.state.profile or rules.DEFAULT_PROFILE
+        compute = partial(incremental.compare_incremental, self.state.std_df, self.state.sys_df,
+                          self.state.compare_memo, workers=workers, suggest=suggest, profile=profile,
+                          progress=progress, cancel=cancel)
+        self._compare_cached = False
+        if std_digest and sys_digest:
+            def run():
+                self._compare_cached = False
+                return compute()
+
+            self._compare_cached = True    # 未命中时 run() 会改回 False
+            return cache.cached_compare(self.result_cache, std_digest, sys_digest, run,
+                                        engine=comparator.DEFAULT_ENGINE, suggest=suggest, profile=profile)
+        return compute()
+
     def _on_compared(self, result):
-        # 统一校验 compare() 返回值
+        # 统一校验比对返回值
         try:
-            std_df, sys_df = self._validate_compare_result(result)
+            result = self._validate_compare_result(result)
         except Exception as e:
             import traceback, pprint
             tb = traceback.format_exc()
@@ -277,40 +483,233 @@ class MainWindow(QMainWindow):
             self._on_error(detail + "\n\n" + tb)
             return
 
-        self.state.result_df = std_df
-        self.state.sys_df = sys_df
+        # 结果列不写回读取的表，显示时作为附加列拼在右侧
+        self.state.compare_result = result
+        self.state.result_df = None
+        self.state.meta.pop("stream_out", None)
 
-        self.model_std.setDataFrame(std_df)
-        self.model_sys.setDataFrame(sys_df)
+        self.model_std.setDataFrame(self.state.std_df, result.std_columns())
+        self.model_sys.setDataFrame(self.state.sys_df, result.sys_columns())
 
         # 轻量自适应列宽（一次）
         QTimer.singleShot(0, lambda: self._autosize_columns_fast(self.table_std))
         QTimer.singleShot(0, lambda: self._autosize_columns_fast(self.table_sys))
 
         try:
-            ok_std = (std_df["比对结果"] == "OK").sum()
-            ng_std = (std_df["比对结果"] == "NG").sum()
-            ok_sys = (sys_df["比对结果"] == "OK").sum()
-            ng_sys = (sys_df["比对结果"] == "NG").sum()
+            ok_std = int((result.std_status == comparator.STATUS_OK).sum())
+            ng_std = int((result.std_status == comparator.STATUS_NG).sum())
+            ok_sys = int((result.sys_status == comparator.STATUS_OK).sum())
+            ng_sys = int((result.sys_status == comparator.STATUS_NG).sum())
+            orphan_sys = int(result.sys_orphan.sum())
+            orphan_std_keys = result.orphan_std_keys
+        except Exception:
+            ok_std = ng_std = ok_sys = ng_sys = orphan_sys = orphan_std_keys = 0
+
+        self._update_summary_chips(ok_std, ng_std, ok_sys, ng_sys, orphan_sys, orphan_std_keys)
+        memo = self.state.compare_memo
+        if self._compare_cached:
+            # 结果直接取自缓存，增量比对没有运行，memo 里的重算组数是上一次的
+            self.status.showMessage("比对完成（命中缓存）", 5000)
+        elif memo is not None and memo.total_keys:
+            self.status.showMessage(f"比对完成（重算 {memo.recomputed_keys}/{memo.total_keys} 组）", 5000)
+        else:
+            self.status.showMessage("比对完成", 5000)
+
+    # ---------------------- 联动选择 ---------------------- #
+    def _on_std_row_changed(self, current, _previous):
+        links = getattr(self.state.compare_result, "links", None)
+        if links is None or not current.isValid():
+            return
+        row = current.row()
+        rows = links.sys_rows(row)
+        if len(rows):
+            self._select_rows(self.table_sys, rows)
+            self.status.showMessage(f"标准第 {row + 1} 行 ↔ {len(rows)} 行系统数据", 3000)
+            return
+        # 没有命中：退而定位到最近的系统行（有解释列时）
+        near = self.state.compare_result.std_near
+        if near is not None and near[row] >= 0:
+            self._select_rows(self.table_sys, [int(near[row])])
+            self.status.showMessage(f"标准第 {row + 1} 行无匹配，已定位最近系统行 {int(near[row]) + 1}", 3000)
+        else:
+            self.table_sys.clearSelection()
+            self.status.showMessage(f"标准第 {row + 1} 行没有匹配的系统行", 3000)
+
+    def _on_sys_row_changed(self, current, _previous):
+        links = getattr(self.state.compare_result, "links", None)
+        if links is None or not current.isValid():
+            return
+        row = current.row()
+        rows = links.std_rows(row)
+        if len(rows):
+            self._select_rows(self.table_std, rows)
+            self.status.showMessage(f"系统第 {row + 1} 行 ↔ {len(rows)} 行标准数据", 3000)
+        else:
+            self.table_std.clearSelection()
+            self.status.showMessage(f"系统第 {row + 1} 行没有匹配的标准行", 3000)
+
+    @staticmethod
+    def _select_rows(view: QTableView, rows):
+        """选中若干行（已排序）；连续的行合并成一个区间，避免逐行 select 触发大量信号"""
+        model = view.model()
+        last_col = model.columnCount() - 1
+        selection = QItemSelection()
+        rows = [int(r) for r in rows]
+        start = prev = rows[0]
+        for r in rows[1:] + [None]:
+            if r is not None and r == prev + 1:
+                prev = r
+                continue
+            selection.select(model.index(start, 0), model.index(prev, last_col))
+            if r is not None:
+                start = prev = r
+        # 只改选区、不改当前行，避免两侧互相触发
+        view.selectionModel().select(selection, QItemSelectionModel.ClearAndSelect | QItemSelectionModel.Rows)
+        view.scrollTo(model.index(rows[0], 0), QAbstractItemView.PositionAtCenter)
+
+    def show_key_suggestions(self):
+        result = self.state.compare_result
+        suggestions = getattr(result, "key_suggestions", None)
+        if suggestions is None:
+            QMessageBox.information(self, "提示", "请勾选“近似 key 建议”后重新比对")
+            return
+        if not len(suggestions):
+            QMessageBox.information(self, "提示", "孤立标准 key 没有找到近似的系统 key")
+            return
+        dlg = QDialog(self)
+        dlg.setWindowTitle(f"近似 key 建议（{suggestions['标准 key'].nunique()} 个标准 key）")
+        dlg.resize(720, 480)
+        view = QTableView(dlg)
+        view.setModel(DataFrameModel(suggestions))
+        view.setSelectionBehavior(QTableView.SelectRows)
+        view.verticalHeader().setVisible(False)
+        view.horizontalHeader().setSectionResizeMode(QHeaderView.Interactive)
+        QVBoxLayout(dlg).addWidget(view)
+        self._autosize_columns_fast(view)
+        dlg.exec()
+
+    def do_compare_stream(self):
+        """系统文件过大时：逐块读取系统文件、逐块比对，结果直接写入输出文件"""
+        if self.state.std_df is None:
+            QMessageBox.warning(self, "提示", "请先加载标准文件")
+            return
+        sys_path, _ = QFileDialog.getOpenFileName(self, "选择系统文件（流式比对）", "", "Excel (*.xlsx)")
+        if not sys_path:
+            return
+        out_path, _ = QFileDialog.getSaveFileName(self, "比对结果输出到", "对比结果.xlsx", "Excel (*.xlsx)")
+        if not out_path:
+            return
+
+        self.act_compare.setEnabled(False)
+        self.act_compare_stream.setEnabled(False)
+        self.act_compare_batch.setEnabled(False)
+        try:
+            self.setCursor(Qt.BusyCursor)
+        except Exception:
+            pass
+
+        worker = self._start_task(lambda res, p=out_path: self._on_stream_compared(res, p), streaming.compare_stream,
+                                  self.state.std_df, sys_path, out_path, profile=self.state.profile)
+        worker.signals.finished.connect(self._after_compare)
+        self.status.showMessage("正在流式比对...", 3000)
+
+    def _on_stream_compared(self, result, out_path: str = ""):
+        std_df, summary = result
+        # 系统端结果只在输出文件里，界面只显示标准端；之前读入的系统表没参与这次比对，清掉以免误导 / 误导出
+        self.state.result_df = std_df
+        self.state.compare_result = None
+        self.state.sys_df = None
+        self.state.meta.pop("sys_path", None)
+        self.state.meta.pop("sys_digest", None)
+        self.state.meta["stream_out"] = out_path
+        self.model_std.setDataFrame(std_df)
+        self.model_sys.setDataFrame(None)
+        QTimer.singleShot(0, lambda: self._autosize_columns_fast(self.table_std))
+        self._update_summary_chips(summary["std_ok"], summary["std_ng"], summary["sys_ok"], summary["sys_ng"])
+        self.status.showMessage(f"流式比对完成：系统 {summary['sys_rows']} 行，结果已写入输出文件", 8000)
+
+    def do_compare_batch(self):
+        """同一份系统文件对多份标准文件：系统端只预处理一次，每份标准各导出一份结果"""
+        if self.state.sys_df is None:
+            QMessageBox.warning(self, "提示", "请先加载系统文件")
+            return
+        paths, _ = QFileDialog.getOpenFileNames(self, "选择多个标准文件", "", "Excel (*.xlsx *.xls)")
+        if not paths:
+            return
+        out_dir = QFileDialog.getExistingDirectory(self, "选择结果输出目录")
+        if not out_dir:
+            return
+
+        self.act_compare.setEnabled(False)
+        self.act_compare_stream.setEnabled(False)
+        self.act_compare_batch.setEnabled(False)
+        try:
+            self.setCursor(Qt.BusyCursor)
         except Exception:
-            ok_std = ng_std = ok_sys = ng_sys = 0
+            pass
 
-        self._update_summary_chips(ok_std, ng_std, ok_sys, ng_sys)
-        self.status.showMessage("比对完成", 5000)
+        worker = self._start_task(self._on_batch_compared, batch.run_batch_files,
+                                  paths, self.state.sys_df, out_dir, profile=self.state.profile)
+        worker.signals.finished.connect(self._after_compare)
+        self.status.showMessage(f"正在批量比对 {len(paths)} 份标准文件...", 3000)
+
+    def _on_batch_compared(self, summary):
+        lines = [
+            f"{r['标准文件']}：标准 OK {r['标准 OK']} / NG {r['标准 NG']}，系统 OK {r['系统 OK']} / NG {r['系统 NG']}"
+            for _, r in summary.iterrows()
+        ]
+        QMessageBox.information(self, "批量比对完成", "\n".join(lines) + "\n\n结果与 批量汇总.xlsx 已写入输出目录")
+        self.status.showMessage("批量比对完成", 5000)
 
     def export_excel(self):
-        if self.state.result_df is None or self.state.sys_df is None:
+        result = self.state.compare_result
+        stream_out = self.state.meta.get("stream_out")
+        if result is None and stream_out:
+            # 流式比对的完整结果（含系统端）已写在输出文件里，导出即复制该文件
+            path, _ = QFileDialog.getSaveFileName(self, "导出结果", "对比结果.xlsx", "Excel (*.xlsx)")
+            if not path:
+                return
+            if os.path.abspath(path) == os.path.abspath(stream_out):
+                QMessageBox.information(self, "完成", "结果已在该文件中")
+                return
+            worker = Worker(shutil.copyfile, stream_out, path)
+            worker.signals.error.connect(self._on_error)
+            worker.signals.finished.connect(lambda: QMessageBox.information(self, "完成", "导出成功"))
+            self.thread_pool.start(worker)
+            self.status.showMessage("正在导出...", 3000)
+            return
+        if (result is None and self.state.result_df is None) or self.state.sys_df is None:
             QMessageBox.warning(self, "提示", "请完成一次比对后再导出")
             return
         path, _ = QFileDialog.getSaveFileName(self, "导出结果", "对比结果.xlsx", "Excel (*.xlsx)")
         if not path:
             return
-        worker = Worker(exporter.export, self.state.result_df, self.state.sys_df, path)
+        if result is not None:
+            # copy-free 结果：原表 + 结果列在写出时拼接
+            worker = Worker(exporter.export, self.state.std_df, self.state.sys_df, path, result)
+        else:
+            worker = Worker(exporter.export, self.state.result_df, self.state.sys_df, path)
         worker.signals.error.connect(self._on_error)
         worker.signals.finished.connect(lambda: QMessageBox.information(self, "完成", "导出成功"))
         self.thread_pool.start(worker)
         self.status.showMessage("正在导出...", 3000)
 
+    def load_rules(self):
+        path, _ = QFileDialog.getOpenFileName(self, "选择匹配规则", "", "规则配置 (*.json *.yaml *.yml)")
+        if not path:
+            return
+        try:
+            profile = rules.load_profile(path)
+        except Exception as e:
+            QMessageBox.warning(self, "规则无效", str(e))
+            return
+        self.state.profile = profile
+        self.status.showMessage(f"已切换匹配规则：{profile.name}", 5000)
+
+    def clear_result_cache(self):
+        freed = self.result_cache.clear() + self.frame_cache.clear()
+        self.status.showMessage(f"比对 / 读表缓存已清除（释放 {freed / 1024 / 1024:.1f} MB）", 5000)
+
     def go_home(self):
         # 优先使用显式传入的首页引用
         home = getattr(self, "home_window", None)